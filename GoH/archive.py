@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+"""
+The archive module reads corpus pages directly from the tar archive of the corpus, so that
+the OCR reports do not need an extracted copy of the corpus.
+
+The first time an archive is opened, the position (`offset`) and `size` of every page
+in the uncompressed tar stream is recorded in a member index, saved next to the archive
+as `<archive>.index.json`. Pages can then be read without parsing the tar headers again,
+and the archive can be split into ranges of pages for parallel workers.
+
+Note:
+    A gzip stream can only be decompressed from the start. If the optional `indexed_gzip`
+    package is installed, its seek points are saved next to the archive as
+    `<archive>.gzidx` and reading a page only decompresses from the nearest seek point.
+    Without it, reads are sorted by offset and served from a single forward pass over
+    the stream, skipping the pages that were not requested, and readers of separate
+    ranges each decompress the stream from the start (see :func:`seekable`).
+    Uncompressed `.tar` files are always read directly at the page offsets.
+
+Hidden files (whose name starts with a dot, such as the `._*` AppleDouble files of
+archives made on macOS) are not indexed, like the hidden files of a corpus directory.
+The doc_id of a page is the basename of its member, so an archive with two pages of
+the same name in different directories cannot be indexed.
+
+Examples:
+    >>> index = GoH.archive.load_index('2017-05-corpus.tar.gz')
+    >>> for doc_id, content in GoH.archive.iter_pages('2017-05-corpus.tar.gz', names=sample):
+    ...     print(doc_id)
+"""
+import gzip
+import json
+import os
+import tarfile
+
+try:
+    import indexed_gzip
+except ImportError:
+    indexed_gzip = None
+
+
+# Version of the member index format, to rebuild indexes saved by earlier versions.
+INDEX_VERSION = 2
+
+
+def index_path( fname ):
+    """Location of the member index of an archive."""
+    return '{}.index.json'.format(fname)
+
+
+def build_index( fname ):
+    """Record the offset and size of every file in a tar archive.
+    Saves the index next to the archive and returns it.
+
+    Args:
+        fname (str): Path to the tar archive (compressed with gzip or uncompressed).
+
+    Returns:
+        dict: Dictionary with the archive `mtime` and `size`, and `members`, a list of
+        `[name, offset, size]` entries in archive order. The offset is the position of
+        the file content in the uncompressed tar stream. Hidden files are skipped.
+
+    Raises:
+        ValueError: If two pages have the same doc_id (basename).
+    """
+    members = []
+    locations = {}
+    with tarfile.open(fname, 'r:*') as tf:
+        for member in tf:
+            doc_id = os.path.basename(member.name)
+            if member.isfile() and not doc_id.startswith('.'):
+                if doc_id in locations:
+                    raise ValueError('Pages {} and {} of {} have the same doc_id'.format(
+                        locations[doc_id], member.name, fname))
+                locations[doc_id] = member.name
+                members.append([member.name, member.offset_data, member.size])
+
+    stat = os.stat(fname)
+    index = {'version': INDEX_VERSION, 'mtime': stat.st_mtime, 'size': stat.st_size, 'members': members}
+    with open(index_path(fname), 'w') as f:
+        json.dump(index, f)
+
+    return index
+
+
+def load_index( fname, rebuild=False ):
+    """Load the member index of an archive, building it if it is missing or out of date.
+
+    Args:
+        fname (str): Path to the tar archive.
+        rebuild (bool): Build the index even if a current one exists.
+
+    Returns:
+        dict: The member index, as described in :func:`build_index`.
+    """
+    path = index_path(fname)
+    if not rebuild and os.path.exists(path):
+        with open(path) as f:
+            index = json.load(f)
+        stat = os.stat(fname)
+        if (index.get('version') == INDEX_VERSION and index['mtime'] == stat.st_mtime
+                and index['size'] == stat.st_size):
+            return index
+
+    return build_index(fname)
+
+
+def split_ranges( members, num_ranges ):
+    """Split the members of an archive into contiguous ranges of about the same total size.
+
+    Args:
+        members (list): `[name, offset, size]` entries, in archive order.
+        num_ranges (int): Number of ranges to create.
+
+    Returns:
+        list: Lists of entries. There are at most `num_ranges` lists and none is empty.
+    """
+    total = sum(size for name, offset, size in members)
+    target = total / max(num_ranges, 1)
+
+    ranges = []
+    current = []
+    current_size = 0
+    for entry in members:
+        current.append(entry)
+        current_size += entry[2]
+        if current_size >= target and len(ranges) < num_ranges - 1:
+            ranges.append(current)
+            current = []
+            current_size = 0
+    if current:
+        ranges.append(current)
+
+    return ranges
+
+
+def is_gzip( fname ):
+    """Whether a file is compressed with gzip."""
+    with open(fname, 'rb') as f:
+        return f.read(2) == b'\x1f\x8b'
+
+
+def seekable( fname ):
+    """Whether pages of an archive can be read without decompressing the stream before them.
+    This is the case for uncompressed archives, and for gzip archives if `indexed_gzip`
+    is installed.
+    """
+    return indexed_gzip is not None or not is_gzip(fname)
+
+
+class ArchiveReader(object):
+    """Reads files from an archive at the offsets of its member index.
+
+    Args:
+        fname (str): Path to the tar archive.
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.stream = self._open()
+
+    def _open(self):
+        if not is_gzip(self.fname):
+            return open(self.fname, 'rb')
+
+        if indexed_gzip is None:
+            return gzip.open(self.fname, 'rb')
+
+        stream = indexed_gzip.IndexedGzipFile(self.fname)
+        seek_points = '{}.gzidx'.format(self.fname)
+        if os.path.exists(seek_points):
+            stream.import_index(seek_points)
+        else:
+            stream.build_full_index()
+            stream.export_index(seek_points)
+        return stream
+
+    def read( self, offset, size ):
+        """Return the `size` bytes at `offset` in the uncompressed tar stream."""
+        if self.stream.tell() != offset:
+            self.stream.seek(offset)
+        return self.stream.read(size)
+
+    def read_entries( self, entries ):
+        """Yield the name and content of each `[name, offset, size]` entry.
+        The entries are read in offset order, so a gzip stream is only read forward.
+        """
+        for name, offset, size in sorted(entries, key=lambda entry: entry[1]):
+            yield name, self.read(offset, size)
+
+    def close( self ):
+        self.stream.close()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.close()
+
+
+def select_members( index, names=None ):
+    """Return the index entries for a set of pages.
+
+    Args:
+        index (dict): The member index of the archive.
+        names (iterable): Page names to select, as either the member name or its basename
+            (the doc_id). All pages are selected if None.
+
+    Returns:
+        list: `[name, offset, size]` entries, in archive order.
+    """
+    if names is None:
+        return index['members']
+
+    names = set(names)
+    return [entry for entry in index['members']
+            if entry[0] in names or os.path.basename(entry[0]) in names]
+
+
+def iter_pages( fname, names=None, entries=None ):
+    """Yield the doc_id and text of pages of an archive.
+
+    Args:
+        fname (str): Path to the tar archive.
+        names (iterable): Pages to read, see :func:`select_members`. All pages if None.
+        entries (list): Index entries to read, such as a range from :func:`split_ranges`.
+            Takes precedence over `names`.
+
+    Yields:
+        tuple: The doc_id (basename of the member) and the content decoded as UTF-8, in
+        archive order.
+    """
+    if entries is None:
+        entries = select_members(load_index(fname), names)
+
+    with ArchiveReader(fname) as reader:
+        for name, content in reader.read_entries(entries):
+            yield os.path.basename(name), content.decode('utf8')
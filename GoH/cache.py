@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+The cache module stores document reports on disk so that repeated runs over a corpus
+only evaluate the pages that have changed since the last run.
+
+Reports are keyed by a hash of the page content, within a section for the spelling
+dictionary used to create them. Renamed or copied pages (such as the unchanged pages
+of a new cleaning cycle directory) are found in the cache, and changing the spelling
+dictionary never returns reports made with a different one.
+
+Examples:
+    >>> cache = GoH.cache.ReportCache('ocr-reports.cache', spelling_dictionary)
+    >>> statistics = GoH.reports.process_directory(directory, spelling_dictionary, cache=cache)
+"""
+import hashlib
+import json
+import os
+import pickle
+
+
+def content_hash( content ):
+    """Hash the content of a document.
+
+    Args:
+        content (str): Content of the document.
+
+    Returns:
+        str: Hex digest of the SHA-1 hash of the UTF-8 encoded content.
+    """
+    return hashlib.sha1(content.encode('utf8')).hexdigest()
+
+
+def dictionary_fingerprint( spelling_dictionary ):
+    """Fingerprint a spelling dictionary.
+    The fingerprint only depends on the words in the dictionary, not on the order in
+    which they were added.
+
+    Args:
+        spelling_dictionary (set): The set of verified words.
+
+    Returns:
+        str: Hex digest of the SHA-1 hash of the sorted words.
+    """
+    fingerprint = getattr(spelling_dictionary, 'fingerprint', None)
+    if fingerprint is not None:
+        return fingerprint
+
+    digest = hashlib.sha1()
+    for word in sorted(spelling_dictionary):
+        digest.update(word.encode('utf8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class ReportCache(object):
+    """Persistent store of document reports.
+
+    Args:
+        path (str): Location of the cache file. It is created on the first :meth:`save`.
+        spelling_dictionary (set): The dictionary the reports are made with.
+    """
+
+    def __init__(self, path, spelling_dictionary):
+        self.path = path
+        self.fingerprint = dictionary_fingerprint(spelling_dictionary)
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.sections = pickle.load(f)
+        else:
+            self.sections = {}
+        self.reports = self.sections.setdefault(self.fingerprint, {})
+
+    def get( self, key ):
+        """Return the cached report for a content hash, or None, counting hits and misses."""
+        report = self.reports.get(key)
+        if report is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return report
+
+    def put( self, key, report ):
+        """Store a copy of a report under a content hash. The `doc_id` is not stored."""
+        self.reports[key] = {k: v for k, v in report.items() if k != 'doc_id'}
+        self.reports[key]['errors'] = dict(report['errors'])
+
+    def save( self ):
+        """Write the cache to disk, replacing the previous file only once it is complete."""
+        tmp_path = '{}.tmp'.format(self.path)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.sections, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+
+def counts_fingerprint( counts ):
+    """Fingerprint a mapping of words to counts (such as the `WORDS` of the spell check).
+
+    Args:
+        counts (dict): Words and their counts.
+
+    Returns:
+        str: Hex digest of the SHA-1 hash of the sorted words and counts.
+    """
+    digest = hashlib.sha1()
+    for word, count in sorted(counts.items()):
+        digest.update('{}\t{}\n'.format(word, count).encode('utf8'))
+    return digest.hexdigest()
+
+
+class SubstituteCache(object):
+    """Persistent store of spelling substitution decisions (error to best substitute).
+    Errors without a substitute are stored as None, so they are not checked again either.
+
+    Decisions are kept in a section for the spelling dictionary and word counts used
+    to make them. The file is JSON, so decisions can be reviewed by hand.
+
+    Args:
+        path (str): Location of the cache file. It is created on the first :meth:`save`.
+        spelling_dictionary (set): The dictionary of the spell check.
+        WORDS (dict): The word counts of the spell check.
+    """
+
+    def __init__(self, path, spelling_dictionary, WORDS):
+        self.path = path
+        self.fingerprint = '{}-{}'.format(dictionary_fingerprint(spelling_dictionary), counts_fingerprint(WORDS))
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.sections = json.load(f)
+        else:
+            self.sections = {}
+        self.decisions = self.sections.setdefault(self.fingerprint, {})
+
+    def __contains__( self, error ):
+        return error in self.decisions
+
+    def get( self, error ):
+        """Return the substitute stored for an error (None if it has no substitute)."""
+        return self.decisions.get(error)
+
+    def put( self, error, substitute ):
+        self.decisions[error] = substitute
+
+    def save( self ):
+        """Write the cache to disk, replacing the previous file only once it is complete."""
+        tmp_path = '{}.tmp'.format(self.path)
+        with open(tmp_path, 'w') as f:
+            json.dump(self.sections, f)
+        os.replace(tmp_path, self.path)
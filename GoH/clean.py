@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import numpy as np
+import pandas as pd
 import re
 
 def period_at_end(token):
@@ -9,8 +11,24 @@ def period_at_end(token):
         return False
 
 
-def create_substitution(tokens, stem, get_prior, spelling_dictionary):
-    locations = [i for i, j in enumerate(tokens) if j == stem]
+def token_positions(tokens):
+    """Index the positions of each token, so the occurrences of many stems can be
+    looked up without scanning the token list for each one.
+
+    Returns:
+        dict: List of the positions of each token, in order.
+    """
+    positions = {}
+    for i, token in enumerate(tokens):
+        positions.setdefault(token, []).append(i)
+    return positions
+
+
+def create_substitution(tokens, stem, get_prior, spelling_dictionary, positions=None):
+    if positions is None:
+        locations = [i for i, j in enumerate(tokens) if j == stem]
+    else:
+        locations = positions.get(stem, [])
     for location in locations:
         # Option 1
         if get_prior:
@@ -43,13 +61,14 @@ def create_substitution(tokens, stem, get_prior, spelling_dictionary):
 
 
 def check_if_stem(stems, spelling_dictionary, tokens, get_prior=True):
+    positions = token_positions(tokens)
     replacements = []
     for stem in stems:
         if len(stem) > 1:
             if period_at_end(stem):
                 stem_stripped = "".join(list(stem)[:-1])
                 if not stem_stripped.lower() in spelling_dictionary:
-                    result = create_substitution(tokens, stem, get_prior, spelling_dictionary)
+                    result = create_substitution(tokens, stem, get_prior, spelling_dictionary, positions)
                     if result is None:
                         pass
                     else:
@@ -57,7 +76,7 @@ def check_if_stem(stems, spelling_dictionary, tokens, get_prior=True):
 
             else:
                 if not stem.lower() in spelling_dictionary:
-                    result = create_substitution(tokens, stem, get_prior, spelling_dictionary)
+                    result = create_substitution(tokens, stem, get_prior, spelling_dictionary, positions)
                     if result is None:
                         pass
                     else:
@@ -66,8 +85,55 @@ def check_if_stem(stems, spelling_dictionary, tokens, get_prior=True):
     return replacements
 
 
+def _split_pattern(pair):
+    return '{}\\s+{}'.format(re.escape(pair[0]), re.escape(pair[1]))
+
+
 def replace_split_words(pair, content):
-    return re.sub('{}\s+{}'.format(pair[0], pair[1]), '{}{}'.format(pair[0], pair[1]), content)
+    joined = '{}{}'.format(pair[0], pair[1])
+    return re.sub(_split_pattern(pair), lambda match: joined, content)
+
+
+def replace_split_word_pairs(pairs, content):
+    """Rejoin all of the split word pairs in a single pass over the content.
+
+    Gives the same result as calling :func:`replace_split_words` for each pair in
+    order. Pairs are tried in order at each position, so when two pairs match at the
+    same place the first one wins, as it does when they are applied one by one. If the
+    matches of different pairs overlap, or rejoining a pair creates a match for another,
+    the order of the calls matters and the pairs are applied one by one instead.
+
+    Args:
+        pairs (list): (stem, next word) tuples, such as those from :func:`check_if_stem`.
+        content (str): File content.
+
+    Returns:
+        str: Content with the pairs rejoined.
+    """
+    pairs = list(pairs)
+    if any(not word or re.search(r'\s', word) for pair in pairs for word in pair):
+        for pair in pairs:
+            content = replace_split_words(pair, content)
+        return content
+
+    distinct = list(dict.fromkeys(pairs))
+    if not distinct:
+        return content
+    pattern = re.compile('|'.join('({})'.format(_split_pattern(pair)) for pair in distinct))
+    joined = ['{}{}'.format(*pair) for pair in distinct]
+
+    # Every place a pair matches, with the first pair that matches there.
+    matches = [match.span(match.lastindex) for match in re.finditer('(?={})'.format(pattern.pattern), content)]
+    overlapping = any(start < previous_end for (_, previous_end), (start, _) in zip(matches, matches[1:]))
+
+    if not overlapping:
+        rejoined = pattern.sub(lambda match: joined[match.lastindex - 1], content)
+        if pattern.search(rejoined) is None:
+            return rejoined
+
+    for pair in pairs:
+        content = replace_split_words(pair, content)
+    return content
 
 
 def replace_pair(pair, content):
@@ -79,6 +145,79 @@ def replace_pair(pair, content):
     return re.sub(pair[0], ' {} '.format(pair[1]), content)
 
 
+class MultiReplacer(object):
+    """Replaces many strings at once, in a single scan of the content.
+
+    The strings to replace are compiled into one regex shaped like a trie of their
+    characters, so the regex engine follows a single branch of the trie at each
+    position instead of trying every string. At each position the longest string
+    that matches is replaced, and the scan continues after it.
+
+    Unlike :func:`replace_pair`, the strings are matched literally and only as whole
+    words: a string that starts (or ends) with a letter, digit or underscore does not
+    match if it is preceded (or followed) by one.
+
+    Usage::
+
+        >>> replacer = MultiReplacer(GoH.normalize.auto_spell_check(errors, spelling_dictionary, WORDS))
+        >>> content = replacer(content)
+        >>> pipeline = GoH.corrections.CorrectionPipeline(GoH.corrections.CORRECTION_RULES + [replacer.rule('spelling')])
+
+    Args:
+        pairs (iterable): (string, replacement) tuples, or a dictionary. If a string
+            appears more than once, its first replacement is used.
+    """
+
+    def __init__(self, pairs):
+        if isinstance(pairs, dict):
+            pairs = pairs.items()
+        self.replacements = {}
+        for string, replacement in pairs:
+            if string:
+                self.replacements.setdefault(string, replacement)
+
+        trie = {}
+        for string in self.replacements:
+            node = trie
+            for character in string:
+                node = node.setdefault(character, {})
+            node[None] = True
+        self.pattern = re.compile(_trie_pattern(trie, None)) if trie else None
+
+    def _replace(self, match):
+        return self.replacements[match.group()]
+
+    def subn(self, content):
+        """Return the content with the strings replaced, and the number of replacements."""
+        if self.pattern is None:
+            return content, 0
+        return self.pattern.subn(self._replace, content)
+
+    def __call__(self, content):
+        return self.subn(content)[0]
+
+    def rule(self, name):
+        """Return a (name, pattern, replacement) rule for `GoH.corrections.CorrectionPipeline`."""
+        return (name, self.pattern or re.compile(r'(?!)'), self._replace)
+
+
+def _trie_pattern(node, previous):
+    # Longer strings are tried before a string ends, so the longest match wins.
+    # Word boundaries are only added next to word characters.
+    branches = []
+    for character in sorted(key for key in node if key is not None):
+        branch = re.escape(character) + _trie_pattern(node[character], character)
+        if previous is None and re.match(r'\w', character):
+            branch = r'(?<!\w)' + branch
+        branches.append(branch)
+    if None in node:
+        branches.append(r'(?!\w)' if re.match(r'\w', previous) else '')
+
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:{})'.format('|'.join(branches))
+
+
 def find_split_words(pattern, content):
     return pattern.findall(content)
 
@@ -128,3 +267,87 @@ def check_for_repeating_characters(tokens, character):
             pass
 
     return replacements
+
+
+def _repeating_pattern(character):
+    # The pattern of `check_for_repeating_characters`, compiled once.
+    return re.compile("([" + character + "{2,}]{2,4})")
+
+
+_RUN = re.compile(r'(.)\1*')
+_ALPHA = re.compile(r'[^\W\d_]')
+_VOWEL = re.compile(r'[aeiouAEIOU]')
+
+
+def _count_per_token(pattern, text, starts):
+    # Count the matches of a pattern in the newline-joined tokens, for each token.
+    positions = np.fromiter((match.start() for match in pattern.finditer(text)), dtype=np.int64)
+    return np.bincount(np.searchsorted(starts, positions, side='right') - 1, minlength=len(starts))
+
+
+def noise_features(tokens, characters=()):
+    """Describe the distinct tokens of a batch, to tell OCR noise from words.
+
+    Each feature is computed with one regex scan over all of the tokens joined by
+    newlines, rather than one scan per token.
+
+    Args:
+        tokens (iterable): Tokens without whitespace, such as the errors of a corpus.
+        characters (iterable): Character classes, as the `character` argument of
+            :func:`check_for_repeating_characters`.
+
+    Returns:
+        dataframe: One row per distinct token, in order of first appearance, with its
+        `length`, the length of its longest run of a single character (`max_run`), the
+        share of its characters that are letters (`alpha_ratio`), the share of its
+        letters that are vowels (`vowel_ratio`), the number of runs of each character
+        class (a `repeating_<character>` column each), and `noise`, true for the tokens
+        that :func:`check_for_repeating_characters` replaces for any of the classes.
+    """
+    tokens = list(dict.fromkeys(tokens))
+    if any('\n' in token for token in tokens):
+        raise ValueError('Tokens cannot contain newlines')
+    text = '\n'.join(tokens)
+    lengths = np.array([len(token) for token in tokens], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lengths + 1)[:-1]]) if tokens else np.zeros(0, dtype=np.int64)
+
+    runs = [(match.start(), match.end() - match.start()) for match in _RUN.finditer(text) if match.group(1) != '\n']
+    max_run = np.zeros(len(tokens), dtype=np.int64)
+    if runs:
+        positions, run_lengths = np.array(runs).T
+        np.maximum.at(max_run, np.searchsorted(starts, positions, side='right') - 1, run_lengths)
+
+    alpha = _count_per_token(_ALPHA, text, starts)
+    vowels = _count_per_token(_VOWEL, text, starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features = pd.DataFrame({'length': lengths,
+                                 'max_run': max_run,
+                                 'alpha_ratio': np.where(lengths > 0, alpha / lengths, 0.0),
+                                 'vowel_ratio': np.where(alpha > 0, vowels / alpha, 0.0)},
+                                index=pd.Index(tokens, dtype=object, name='token'))
+
+    noise = np.zeros(len(tokens), dtype=bool)
+    for character in characters:
+        pattern = _repeating_pattern(character)
+        if pattern.search('\n\n'):
+            counts = np.array([len(pattern.findall(token)) for token in tokens], dtype=np.int64)
+        else:
+            counts = _count_per_token(pattern, text, starts)
+        features['repeating_{}'.format(character)] = counts
+        noise |= (lengths > 12) & (counts > 2)
+    features['noise'] = noise
+
+    return features
+
+
+def noise_replacements(tokens, characters):
+    """Find the noise tokens of a whole batch for several character classes at once.
+
+    Gives the same pairs as :func:`check_for_repeating_characters` called for each class,
+    with each token listed once.
+
+    Returns:
+        list: (token, ' ') tuples, in order of first appearance.
+    """
+    features = noise_features(tokens, characters)
+    return [(token, ' ') for token in features.index[features['noise']]]
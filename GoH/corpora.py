@@ -1,11 +1,14 @@
+from collections import Counter, OrderedDict
 from gensim import utils
 from gensim.parsing.preprocessing import STOPWORDS
 from GoH.preprocess import ENTITIES
+from GoH import utilities
 import itertools
 import logging
 from nltk.stem.wordnet import WordNetLemmatizer
 from nltk import word_tokenize
 import os
+import pickle
 import re
 import sys
 import tarfile
@@ -71,15 +74,20 @@ def head(stream, n=10):
     return list(itertools.islice(stream, n))
 
 
-def connect_phrases(content, entities=ENTITIES):
+def connect_phrases(content, entities=ENTITIES, joiner=None):
     """Convert named entities into a single token.
 
     Args:
         content ():
         entities (str): List of frequent phrases, calculated separately and loaded from file for convenience.
+        joiner (PhraseJoiner): Join the phrases with a :class:`PhraseJoiner` instead of
+            looking for them among the TextBlob noun phrases. `entities` is then ignored.
     Yields:
         str: text of the file converted to lower case.
     """
+    if joiner is not None:
+        return joiner.join(content)
+
     phrases = []
         
     # Use TextBlob to identify candidate phrases in incomming pages.
@@ -98,6 +106,124 @@ def connect_phrases(content, entities=ENTITIES):
     return content
 
 
+class PhraseJoiner(object):
+    """Joins the words of known phrases into single `a_b` tokens without a tagger.
+
+    The phrases are stored in a trie of their words. The text is scanned once, word by
+    word, and at each word the longest phrase that starts there (with its words separated
+    by single spaces) is joined with underscores.
+
+    This differs from :func:`connect_phrases`, which only joins the phrases that TextBlob
+    finds as noun phrases somewhere on the page, but then joins them wherever their
+    characters occur, including inside longer words. See :func:`phrase_agreement`.
+
+    Usage::
+
+        >>> joiner = PhraseJoiner(ENTITIES)
+        >>> joiner.join("The true faith in God")
+        'the true_faith in god'
+        >>> corpus = Lemma_Corpus(fname, joiner=joiner)
+
+    Args:
+        entities: The phrases, as an iterable or a string of phrases separated by ';'.
+    """
+
+    def __init__(self, entities=ENTITIES):
+        if isinstance(entities, str):
+            entities = entities.split(';')
+        self.trie = {}
+        for phrase in entities:
+            words = phrase.lower().split()
+            if len(words) < 2:
+                continue
+            node = self.trie
+            for word in words:
+                node = node.setdefault(word, {})
+            node[None] = True
+
+    def join(self, content):
+        """Return the content in lower case, with the words of the phrases joined."""
+        content = content.lower()
+        words = list(re.finditer(r'\S+', content))
+        joined = []
+        i = 0
+        while i < len(words):
+            node = self.trie
+            end = None
+            j = i
+            while j < len(words) and words[j].group() in node:
+                if j > i and words[j].start() != words[j - 1].end() + 1:
+                    break
+                node = node[words[j].group()]
+                j += 1
+                if None in node:
+                    end = j
+            if end is None:
+                i += 1
+            else:
+                joined.append((words[i].start(), words[end - 1].end()))
+                i = end
+
+        if not joined:
+            return content
+        pieces = []
+        previous = 0
+        for start, end in joined:
+            pieces.append(content[previous:start])
+            pieces.append(content[start:end].replace(' ', '_'))
+            previous = end
+        pieces.append(content[previous:])
+        return ''.join(pieces)
+
+
+def phrase_agreement(pages, joiner=None, entities=ENTITIES):
+    """Compare the phrases joined by a :class:`PhraseJoiner` with those of :func:`connect_phrases`.
+
+    Args:
+        pages (iterable): Page contents, such as those of :func:`iter_Periodicals`.
+        joiner (PhraseJoiner): The joiner to evaluate. Built from `entities` if None.
+        entities: The phrases.
+
+    Returns:
+        dict: The number of `pages`, of pages with the same output (`identical_pages`),
+        of joined phrase tokens found by both (`both`), only by :func:`connect_phrases`
+        (`only_textblob`) or only by the joiner (`only_joiner`), the `precision` and
+        `recall` of the joiner against :func:`connect_phrases`, and the most common
+        disagreements (`textblob_examples`, `joiner_examples`).
+    """
+    if joiner is None:
+        joiner = PhraseJoiner(entities)
+
+    pages_count = identical = 0
+    both = Counter()
+    only_textblob = Counter()
+    only_joiner = Counter()
+    for content in pages:
+        pages_count += 1
+        expected = connect_phrases(content, entities)
+        found = joiner.join(content)
+        if expected == found:
+            identical += 1
+        expected = Counter(token for token in expected.split() if '_' in token)
+        found = Counter(token for token in found.split() if '_' in token)
+        both.update(expected & found)
+        only_textblob.update(expected - found)
+        only_joiner.update(found - expected)
+
+    total_both = sum(both.values())
+    joiner_total = total_both + sum(only_joiner.values())
+    textblob_total = total_both + sum(only_textblob.values())
+    return {'pages': pages_count,
+            'identical_pages': identical,
+            'both': total_both,
+            'only_textblob': sum(only_textblob.values()),
+            'only_joiner': sum(only_joiner.values()),
+            'precision': total_both / joiner_total if joiner_total else float('nan'),
+            'recall': total_both / textblob_total if textblob_total else float('nan'),
+            'textblob_examples': only_textblob.most_common(20),
+            'joiner_examples': only_joiner.most_common(20)}
+
+
 def filter_tokens(tokens):
     """Filter out short and stopword tokens for clustering.
     """
@@ -111,13 +237,132 @@ def filter_tokens(tokens):
     return token_list
 
 
-def lemmatize_tokens(tokens):
+class LemmaCache(object):
+    """Size-bounded cache of the lemmas of token types.
+
+    A page has far fewer distinct types than tokens, and the corpus vocabulary is small
+    compared to its token count, so each type is only lemmatized the first time it is
+    seen. When the cache is full, the least recently used types are dropped.
+
+    The cache can be saved to and loaded from a file, so that later runs start warm.
+    A cache sent to worker processes (for example with a corpus object) takes its
+    entries with it. Workers started by :func:`iter_processed` also send the lemmas
+    they find and their hit and miss counts back with their pages, and these are
+    merged into the cache of the calling process, so that it can be saved and its
+    statistics read as after a serial run.
+
+    Usage::
+
+        >>> cache = LemmaCache(path='lemmas.pkl')
+        >>> lemmas = lemmatize_tokens(tokens, cache)
+        >>> cache.hit_rate()
+        >>> cache.save()
+
+    Args:
+        maxsize (int): Maximum number of types kept.
+        path (str): File to load the cache from, if it exists, and to save it to.
+        lemmatizer: Object with a `lemmatize(token)` method. Defaults to a `WordNetLemmatizer`,
+            created on first use.
+    """
+
+    def __init__(self, maxsize=200000, path=None, lemmatizer=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.lemmatizer = lemmatizer
+        self.hits = 0
+        self.misses = 0
+        self.lemmas = OrderedDict()
+        self._updates = None
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.lemmas.update(pickle.load(f))
+
+    def lemmatize(self, token):
+        """Return the lemma of a token."""
+        try:
+            lemma = self.lemmas[token]
+        except KeyError:
+            self.misses += 1
+            if self.lemmatizer is None:
+                self.lemmatizer = WordNetLemmatizer()
+            lemma = self.lemmas[token] = self.lemmatizer.lemmatize(token)
+            if self._updates is not None:
+                self._updates[token] = lemma
+            if len(self.lemmas) > self.maxsize:
+                self.lemmas.popitem(last=False)
+        else:
+            self.hits += 1
+            self.lemmas.move_to_end(token)
+        return lemma
+
+    def lemmatize_tokens(self, tokens):
+        """Return the lemmas of a list of tokens. Each type is looked up once."""
+        lemmas = {token: self.lemmatize(token) for token in dict.fromkeys(tokens)}
+        return [lemmas[token] for token in tokens]
+
+    def record(self):
+        """Start recording the lemmas and lookups returned by :meth:`updates`."""
+        self._updates = {}
+        self._reported = (self.hits, self.misses)
+
+    def updates(self):
+        """Return the lemmas found, and the numbers of hits and misses, since the last call
+        (or since :meth:`record`), to be added to another cache with :meth:`merge`.
+        """
+        updates = (self._updates, self.hits - self._reported[0], self.misses - self._reported[1])
+        self._updates = {}
+        self._reported = (self.hits, self.misses)
+        return updates
+
+    def merge(self, updates):
+        """Add the lemmas and counts returned by the :meth:`updates` of another cache."""
+        lemmas, hits, misses = updates
+        self.hits += hits
+        self.misses += misses
+        for token, lemma in lemmas.items():
+            self.lemmas[token] = lemma
+            self.lemmas.move_to_end(token)
+            if len(self.lemmas) > self.maxsize:
+                self.lemmas.popitem(last=False)
+
+    def hit_rate(self):
+        """Share of the type lookups found in the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Return the `hits`, `misses`, `hit_rate` and `size` of the cache."""
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate(), 'size': len(self.lemmas)}
+
+    def save(self, path=None):
+        """Save the cache, replacing the previous file only once it is complete."""
+        path = path or self.path
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(dict(self.lemmas), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_updates'] = None
+        if isinstance(state['lemmatizer'], WordNetLemmatizer):
+            state['lemmatizer'] = None
+        return state
+
+
+# Cache shared by every lemmatization of the process.
+LEMMA_CACHE = LemmaCache()
+
+
+def lemmatize_tokens(tokens, cache=None):
     """Convert tokens to lemmas.
+
+    Lemmas are looked up in `cache`, or in the process-wide `LEMMA_CACHE` if None.
     """
-    lemmatizer = WordNetLemmatizer()
-    lemma_tokens = [lemmatizer.lemmatize(token) for token in tokens]
+    if cache is None:
+        cache = LEMMA_CACHE
 
-    return lemma_tokens
+    return cache.lemmatize_tokens(tokens)
 
 
 def doc2id(corpus):
@@ -127,6 +372,70 @@ def doc2id(corpus):
     return doc_dict
 
 
+# Corpus of a worker process, set once by `_init_corpus_worker`.
+_worker_corpus = None
+
+
+def _corpus_lemma_cache(corpus):
+    # The LemmaCache a corpus lemmatizes with, if it has one.
+    if not hasattr(corpus, 'lemma_cache'):
+        return None
+    return corpus.lemma_cache if corpus.lemma_cache is not None else LEMMA_CACHE
+
+
+def _init_corpus_worker(corpus):
+    global _worker_corpus
+    _worker_corpus = corpus
+    cache = _corpus_lemma_cache(corpus)
+    if cache is not None:
+        cache.record()
+
+
+def _process_item(item):
+    processed = item[:-1] + (_worker_corpus.process_corpus(item[-1]),)
+    cache = _corpus_lemma_cache(_worker_corpus)
+    return processed, cache.updates() if cache is not None else None
+
+
+def iter_processed(corpus, items, workers=None, chunksize=100, max_in_flight=None):
+    """Apply the `process_corpus` method of a corpus to a stream of pages.
+
+    The pages are read in the calling process and, with `workers`, processed in a pool
+    of worker processes that each receive the corpus object once. Results are yielded
+    in the order of the pages, with at most `max_in_flight` chunks of pages in the pool.
+    If the corpus has a `lemma_cache`, the lemmas found by the workers and their hits
+    and misses are merged into it (or into `LEMMA_CACHE`) as the pages are yielded.
+
+    Args:
+        corpus: Object with a `process_corpus(content)` method, such as a :class:`Lemma_Corpus`.
+        items (iterable): Tuples ending with the content of a page, such as the
+            `(title, doc_id, content)` tuples of :func:`iter_Periodicals`.
+        workers (int): Number of worker processes. None (default) or 1 processes the
+            pages in the calling process.
+        chunksize (int): Number of pages sent to a worker at a time.
+        max_in_flight (int): Maximum number of chunks in the pool, see
+            :func:`GoH.utilities.parallel_imap`.
+
+    Yields:
+        tuple: Each item with the content replaced by the processed tokens.
+    """
+    if workers is None or workers == 1:
+        for item in items:
+            yield item[:-1] + (corpus.process_corpus(item[-1]),)
+        return
+
+    cache = _corpus_lemma_cache(corpus)
+    for processed, updates in utilities.parallel_imap(_process_item, items,
+                                                      workers=workers,
+                                                      chunksize=chunksize,
+                                                      initializer=_init_corpus_worker,
+                                                      initargs=(corpus,),
+                                                      max_in_flight=max_in_flight):
+        if updates is not None:
+            cache.merge(updates)
+        yield processed
+
+
 # class Basic_Corpus(object):
 #     """Base level processing of the corpus. 
 #     Simple application of the nltk `word_tokenize` function.
@@ -147,41 +456,58 @@ class Standard_Corpus(object):
     """Standard processing of the corpus.
     Named entity phrases are identified prior to tokenizing and the tokens are filtered
     by frequency and length.
+
+    Pass a :class:`PhraseJoiner` as `joiner` to join the phrases without TextBlob.
+    With `workers`, the pages are processed in a pool of worker processes and yielded
+    in corpus order (see :func:`iter_processed`).
     """
 
-    def __init__(self, fname):
+    def __init__(self, fname, joiner=None, workers=None, chunksize=100, max_in_flight=None):
         self.fname = fname
+        self.joiner = joiner
+        self.workers = workers
+        self.chunksize = chunksize
+        self.max_in_flight = max_in_flight
 
     def process_corpus(self, content):
-        content = connect_phrases(content)
+        content = connect_phrases(content, joiner=self.joiner)
         tokens = word_tokenize(content)
 
         return filter_tokens(tokens)
 
 
     def __iter__(self):
-        for title, doc_id, content in iter_Periodicals(self.fname):
-            yield title, doc_id, self.process_corpus(content)
+        return iter_processed(self, iter_Periodicals(self.fname), self.workers, self.chunksize, self.max_in_flight)
 
 
 class Lemma_Corpus(object):
     """Adds lemmatization step to the standard corpus creation workflow.
+    Takes the same `joiner` and `workers` options as :class:`Standard_Corpus`. Lemmas are
+    looked up in `lemma_cache` (a :class:`LemmaCache`), or in the process-wide `LEMMA_CACHE`
+    if None. Each worker starts with a copy of the cache, and the lemmas it finds are merged
+    back into the cache as the pages are yielded.
     """
-    def __init__(self, fname):
+    def __init__(self, fname, joiner=None, workers=None, chunksize=100, max_in_flight=None, lemma_cache=None):
         self.fname = fname
+        self.joiner = joiner
+        self.lemma_cache = lemma_cache
+        self.workers = workers
+        self.chunksize = chunksize
+        self.max_in_flight = max_in_flight
 
     def process_corpus(self, content):
-        content = connect_phrases(content)
+        content = connect_phrases(content, joiner=self.joiner)
         tokens = word_tokenize(content)
-        lemmas = lemmatize_tokens(tokens)
+        lemmas = lemmatize_tokens(tokens, self.lemma_cache)
 
         return filter_tokens(lemmas)
 
     def __iter__(self, log_every=1000):
-        for title, doc_id, content in iter_Periodicals(self.fname):
+        for title, doc_id, tokens in iter_processed(self, iter_Periodicals(self.fname),
+                                                    self.workers, self.chunksize, self.max_in_flight):
             if log_every and doc_id % log_every == 0:
-                logging.info("{}".format(self.process_corpus(content)))
-            yield title, doc_id, self.process_corpus(content)
+                logging.info("{}".format(tokens))
+            yield title, doc_id, tokens
 
 
 class BoWCorpus(object):
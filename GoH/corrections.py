@@ -1,8 +1,28 @@
 # -*- coding: utf-8 -*-
 
+from GoH import archive
 import GoH.clean
+import GoH.reports
 import GoH.utilities
+import os
+import pandas as pd
 import re
+import time
+
+# The corrections of the functions below, as (name, pattern, replacement) rules. The
+# functions and `CorrectionPipeline` both apply these, so the patterns are only
+# written (and compiled) once.
+_DASHES = ('normalize_dashes', re.compile(r"—-—–‑"), r"-")
+_APOSTROPHES = ('normalize_apostrophes', re.compile(r"\’\’\‘\'\‛\´"), r"'")
+_APOSTROPHE_ERROR = ('replace_apostrophe_error', re.compile(r"(\w+)(õ|Õ)"), r"\1'")
+_LINE_ENDINGS = ('connect_line_endings', re.compile(r"(\w+)(\-\s{1,})([a-z]+)"), r"\1\3")
+_SPECIAL_CHARS = ('remove_special_chars', re.compile(r"[^a-zA-Z0-9\s,.!?$:;\-&\'\"]"), r" ")
+
+
+def _apply(rule, content):
+    name, pattern, repl = rule
+    return pattern.sub(repl, content)
+
 
 def normalize_chars(content):
     """Use regex to normalizes dash and apostrophe characters.
@@ -13,10 +33,10 @@ def normalize_chars(content):
         str: file content with normalized characters as a string.
     """
     # Substitute for all other dashes
-    content = re.sub(r"—-—–‑", r"-", content)
+    content = _apply(_DASHES, content)
 
     # Substitute formatted apostrophe
-    content = re.sub(r"\’\’\‘\'\‛\´", r"'", content)
+    content = _apply(_APOSTROPHES, content)
 
     return content
 
@@ -32,7 +52,7 @@ def remove_special_chars(content):
 
     """
     # Replace all special characters with a space (as these tend to occur at the end of lines)
-    return re.sub(r"[^a-zA-Z0-9\s,.!?$:;\-&\'\"]", r" ", content)
+    return _apply(_SPECIAL_CHARS, content)
 
 
 def replace_apostrophe_error(content):
@@ -44,7 +64,7 @@ def replace_apostrophe_error(content):
     Returns
         str: Files content with apostrophes correctly.
     """
-    return re.sub(r"(\w+)(õ|Õ)", r"\1'", content)
+    return _apply(_APOSTROPHE_ERROR, content)
 
 
 def connect_line_endings(content):
@@ -58,7 +78,7 @@ def connect_line_endings(content):
     Returns:
         str: File content with words rejoined.
     """
-    return re.sub(r"(\w+)(\-\s{1,})([a-z]+)", r"\1\3", content)
+    return _apply(_LINE_ENDINGS, content)
 
 
 def rejoin_burst_words(content, spelling_dictionary):
@@ -96,8 +116,155 @@ def rejoin_split_words(content, spelling_dictionary, get_prior=False):
     if len(replacements) > 0:
         for replacement in replacements:
             print(replacement)
-            content = GoH.clean.replace_split_words(replacement, content)
+        content = GoH.clean.replace_split_word_pairs(replacements, content)
     else:
         print("No replacement pairs found.")
 
-    return content
\ No newline at end of file
+    return content
+
+
+def apply_replacements(content, replacements):
+    """Replace errors with their corrections in a single pass over the content.
+
+    Args:
+        content(str): File content.
+        replacements: (error, correction) tuples, such as those from
+            :func:`GoH.normalize.auto_spell_check`, or a :class:`GoH.clean.MultiReplacer`
+            to reuse for many files.
+    Returns:
+        str: Content with every whole-word occurrence of the errors replaced.
+    """
+    if not isinstance(replacements, GoH.clean.MultiReplacer):
+        replacements = GoH.clean.MultiReplacer(replacements)
+    return replacements(content)
+
+# The rules of the functions above, in the order they should be applied. Each rule is
+# a (name, pattern, replacement) tuple, as used by `CorrectionPipeline`.
+CORRECTION_RULES = [_DASHES, _APOSTROPHES, _APOSTROPHE_ERROR, _LINE_ENDINGS, _SPECIAL_CHARS]
+
+
+class CorrectionPipeline(object):
+    """Ordered list of regex corrections, compiled once and applied to whole cleaning cycles.
+
+    The rules are applied one after another, exactly as calling the correction
+    functions in the same order, while counting the replacements and timing each rule.
+
+    Usage::
+
+        >>> pipeline = CorrectionPipeline()
+        >>> dirs = GoH.utilities.define_directories(prev, cycle, base_dir)
+        >>> summary = pipeline.run(dirs['prev'], dirs['cycle'], workers=4)
+        >>> summary['rules']
+
+    Args:
+        rules (list): (name, pattern, replacement) tuples, applied in order. A pattern is
+            a regex string or any object with a `subn(replacement, content)` method, such
+            as a compiled regex. Defaults to `CORRECTION_RULES`.
+    """
+
+    def __init__(self, rules=None):
+        if rules is None:
+            rules = CORRECTION_RULES
+        self.rules = [(name, re.compile(pattern) if isinstance(pattern, str) else pattern, repl)
+                      for name, pattern, repl in rules]
+
+    def correct(self, content):
+        """Apply the rules to a text.
+
+        Returns:
+            tuple: The corrected text, and a list of the number of replacements and the
+            seconds spent for each rule.
+        """
+        counts = []
+        for name, pattern, repl in self.rules:
+            start = time.perf_counter()
+            content, hits = pattern.subn(repl, content)
+            counts.append((hits, time.perf_counter() - start))
+        return content, counts
+
+    def __call__(self, content):
+        return self.correct(content)[0]
+
+    def run(self, source, output_dir, workers=None, chunksize=100, documents=None):
+        """Correct every document of a directory or tar archive, writing the results to
+        `output_dir` under the same doc_id.
+
+        Args:
+            source (str): Directory of the previous cycle, or path to a corpus archive
+                (read with `GoH.archive.iter_pages`).
+            output_dir (str): Directory of the current cycle. Created if needed.
+            workers (int): Number of worker processes. None (default) or 1 processes the
+                documents in the calling process.
+            chunksize (int): Number of documents sent to a worker at a time.
+            documents (iterable): doc_ids of the documents to correct. All documents if None.
+
+        Returns:
+            dict: `documents`, the number of documents; `rules`, a dataframe with the
+            replacements, documents changed and seconds of each rule; and `stages`, the
+            seconds spent reading, correcting and writing (summed over the workers) and
+            the elapsed `total`.
+        """
+        start = time.perf_counter()
+        os.makedirs(output_dir, exist_ok=True)
+
+        if os.path.isfile(source):
+            jobs = ((doc_id, None, content, output_dir) for doc_id, content in archive.iter_pages(source, documents))
+        else:
+            if documents is None:
+                documents = GoH.reports.list_documents(source)
+            jobs = ((doc_id, source, None, output_dir) for doc_id in documents)
+
+        if workers is None or workers == 1:
+            _init_correction_worker(self)
+            results = map(_correct_document, jobs)
+        else:
+            results = GoH.utilities.parallel_imap(_correct_document, jobs,
+                                                  workers=workers,
+                                                  chunksize=chunksize,
+                                                  initializer=_init_correction_worker,
+                                                  initargs=(self,))
+
+        documents = 0
+        hits = [0] * len(self.rules)
+        changed = [0] * len(self.rules)
+        seconds = [0.0] * len(self.rules)
+        stages = {'read': 0.0, 'correct': 0.0, 'write': 0.0}
+        for counts, read_time, write_time in results:
+            documents += 1
+            for i, (rule_hits, rule_seconds) in enumerate(counts):
+                hits[i] += rule_hits
+                changed[i] += rule_hits > 0
+                seconds[i] += rule_seconds
+            stages['read'] += read_time
+            stages['write'] += write_time
+        stages['correct'] = sum(seconds)
+        stages['total'] = time.perf_counter() - start
+
+        rules = pd.DataFrame({'rule': [name for name, pattern, repl in self.rules],
+                              'hits': hits, 'documents': changed, 'seconds': seconds})
+
+        print("Corrected {} documents in {:.1f} seconds".format(documents, stages['total']))
+        return {'documents': documents, 'rules': rules, 'stages': stages}
+
+
+_worker_pipeline = None
+
+
+def _init_correction_worker(pipeline):
+    global _worker_pipeline
+    _worker_pipeline = pipeline
+
+
+def _correct_document(job):
+    doc_id, source, content, output_dir = job
+    start = time.perf_counter()
+    if content is None:
+        content = GoH.utilities.readfile(source, doc_id)
+    read_time = time.perf_counter() - start
+
+    content, counts = _worker_pipeline.correct(content)
+
+    start = time.perf_counter()
+    with open(os.path.join(output_dir, doc_id), 'w', encoding='utf-8') as f:
+        f.write(content)
+    return counts, read_time, time.perf_counter() - start
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""
+The cycles module runs a sequence of cleaning cycles over a corpus directory, writing
+each cycle to its own directory (as :func:`GoH.utilities.define_directories`), and only
+processing the documents whose input changed since the cycle last ran.
+
+The hash of the input and output of every document of every cycle is recorded in a
+state file, `.cycles.json`, in the base directory, along with the error and token counts
+of both. The state is saved every `checkpoint` documents, so an interrupted run resumes
+where it stopped, and the error rate of the corpus before and after each cycle is
+updated from the documents processed, without scoring the corpus again. The counts are
+only valid for the spelling dictionary they were made with, so the state records its
+fingerprint, and every document is processed again when the dictionary changes.
+
+The state also records a fingerprint of the function of each cycle (the hash of its
+pickle). When the function of a cycle changes, such as a
+:class:`GoH.clean.MultiReplacer` made with new replacements, that cycle and every later
+cycle process all their documents again. A module-level function is pickled by name,
+so a change to its code is not seen: pass the cycle to `refresh` instead.
+
+Examples:
+    >>> cycles = [('correction1', GoH.corrections.CorrectionPipeline()),
+    ...           ('correction2', GoH.clean.MultiReplacer(replacements))]
+    >>> run = GoH.cycles.CleaningRun(base_dir, 'raw', cycles, spelling_dictionary)
+    >>> run.run(workers=4)
+"""
+import hashlib
+import json
+import os
+import pickle
+import pandas as pd
+from GoH import reports
+from GoH import utilities
+from GoH.cache import content_hash, dictionary_fingerprint
+
+_worker_cycle = None
+
+
+def _function_fingerprint(function):
+    # Hash of the pickle of a cycle function, or None if it cannot be pickled (it is
+    # then treated as changed on every run).
+    try:
+        return hashlib.sha1(pickle.dumps(function, protocol=4)).hexdigest()
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return None
+
+
+def _init_cycle_worker(function, spelling_dictionary):
+    global _worker_cycle
+    _worker_cycle = (function, spelling_dictionary)
+
+
+def _run_document(job):
+    # Returns None for a document whose input did not change since it was processed.
+    input_dir, output_dir, doc_id, previous = job
+    function, spelling_dictionary = _worker_cycle
+
+    content = utilities.readfile(input_dir, doc_id)
+    input_hash = content_hash(content)
+    if previous is not None and previous[0] == input_hash and os.path.exists(os.path.join(output_dir, doc_id)):
+        return None
+
+    if previous is not None and previous[0] == input_hash:
+        before = previous[2:4]
+    else:
+        report = reports.fast_doc_report(content, spelling_dictionary)
+        before = [report['num_errors'], report['num_tokens']]
+
+    corrected = function(content)
+    with open(os.path.join(output_dir, doc_id), 'w', encoding='utf-8') as f:
+        f.write(corrected)
+
+    output_hash = content_hash(corrected)
+    if output_hash == input_hash:
+        after = before
+    else:
+        report = reports.fast_doc_report(corrected, spelling_dictionary)
+        after = [report['num_errors'], report['num_tokens']]
+
+    return doc_id, [input_hash, output_hash] + before + after
+
+
+class CleaningRun(object):
+    """A resumable sequence of cleaning cycles.
+
+    Args:
+        base_dir (str): Root directory of the cycle directories.
+        source (str): Name of the directory of the uncleaned corpus, in `base_dir`.
+        cycles (list): (name, function) tuples, in order. Each function takes the content
+            of a document and returns the corrected content, and should be picklable
+            (a module-level function or an object such as a
+            :class:`GoH.corrections.CorrectionPipeline`) to run with workers. The output
+            of a cycle is written to the directory `name`, which is the input of the next.
+            A cycle whose function pickles differently from the last run is run again on
+            every document, as are the cycles after it.
+        spelling_dictionary (set): The set of verified words used to compute error rates.
+        checkpoint (int): Number of processed documents between saves of the state.
+    """
+
+    def __init__(self, base_dir, source, cycles, spelling_dictionary, checkpoint=500):
+        self.base_dir = base_dir
+        self.source = source
+        self.cycles = cycles
+        self.spelling_dictionary = spelling_dictionary
+        self.checkpoint = checkpoint
+        self.state_path = os.path.join(base_dir, '.cycles.json')
+        self.fingerprint = dictionary_fingerprint(spelling_dictionary)
+
+        self.state = {}
+        self.functions = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                saved = json.load(f)
+            if saved.get('dictionary') == self.fingerprint:
+                self.state = saved['cycles']
+                self.functions = saved.get('functions', {})
+
+    def save(self):
+        """Write the state to disk, replacing the previous file only once it is complete."""
+        tmp_path = '{}.tmp'.format(self.state_path)
+        with open(tmp_path, 'w') as f:
+            json.dump({'dictionary': self.fingerprint, 'cycles': self.state, 'functions': self.functions}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def run(self, workers=None, chunksize=100, refresh=()):
+        """Run every cycle, processing the documents whose input changed.
+
+        Args:
+            workers (int): Number of worker processes. None (default) or 1 processes the
+                documents in the calling process.
+            chunksize (int): Number of documents sent to a worker at a time.
+            refresh (iterable): Names of cycles to run on every document, such as cycles
+                whose module-level function changed. The cycles after them are also run
+                on every document.
+
+        Returns:
+            dataframe: The :meth:`summary` of the cycles.
+        """
+        prev = self.source
+        changed = False
+        for name, function in self.cycles:
+            fingerprint = _function_fingerprint(function)
+            changed = changed or name in refresh or fingerprint is None or self.functions.get(name) != fingerprint
+            self.run_cycle(prev, name, function, workers, chunksize, refresh=changed)
+            prev = name
+
+        return self.summary()
+
+    def run_cycle(self, prev, name, function, workers=None, chunksize=100, refresh=False):
+        """Run one cycle from the directory `prev` to the directory `name`.
+
+        The output of documents that were processed by the cycle but are no longer in
+        `prev` is deleted. With `refresh`, or if the function of the cycle changed, the
+        records of the cycle are dropped, so every document is processed.
+
+        Returns:
+            int: The number of documents processed.
+        """
+        dirs = utilities.define_directories(prev, name, self.base_dir)
+        os.makedirs(dirs['cycle'], exist_ok=True)
+
+        documents = reports.list_documents(dirs['prev'])
+        records = self.state.get(name, {})
+        current = set(documents)
+        for doc_id in records:
+            if doc_id not in current and os.path.exists(os.path.join(dirs['cycle'], doc_id)):
+                os.remove(os.path.join(dirs['cycle'], doc_id))
+        fingerprint = _function_fingerprint(function)
+        if refresh or fingerprint is None or self.functions.get(name) != fingerprint:
+            records = {}
+        self.functions[name] = fingerprint
+        self.state[name] = records = {doc_id: records[doc_id] for doc_id in documents if doc_id in records}
+
+        jobs = ((dirs['prev'], dirs['cycle'], doc_id, records.get(doc_id)) for doc_id in documents)
+        if workers is None or workers == 1:
+            _init_cycle_worker(function, self.spelling_dictionary)
+            results = map(_run_document, jobs)
+        else:
+            results = utilities.parallel_imap(_run_document, jobs,
+                                              workers=workers,
+                                              chunksize=chunksize,
+                                              initializer=_init_cycle_worker,
+                                              initargs=(function, self.spelling_dictionary))
+
+        processed = 0
+        for result in results:
+            if result is None:
+                continue
+            doc_id, record = result
+            records[doc_id] = record
+            processed += 1
+            if processed % self.checkpoint == 0:
+                self.save()
+        self.save()
+
+        print("Cycle {}: {} of {} documents processed".format(name, processed, len(documents)))
+        return processed
+
+    def changed_documents(self, name):
+        """Return the doc_ids of the documents that a cycle changed, in order."""
+        return sorted(doc_id for doc_id, record in self.state.get(name, {}).items() if record[0] != record[1])
+
+    def summary(self):
+        """Error rates of the corpus before and after each cycle.
+
+        Returns:
+            dataframe: One row per cycle, with the number of `documents`, the number of
+            documents the cycle `changed`, the error rate of the corpus before and after
+            the cycle (errors over tokens) and the `delta` between them.
+        """
+        rows = []
+        for name, function in self.cycles:
+            records = list(self.state.get(name, {}).values())
+            errors_before = sum(record[2] for record in records)
+            tokens_before = sum(record[3] for record in records)
+            errors_after = sum(record[4] for record in records)
+            tokens_after = sum(record[5] for record in records)
+            before = errors_before / tokens_before if tokens_before else float('nan')
+            after = errors_after / tokens_after if tokens_after else float('nan')
+            rows.append({'cycle': name,
+                         'documents': len(records),
+                         'changed': sum(1 for record in records if record[0] != record[1]),
+                         'error_rate_before': before,
+                         'error_rate_after': after,
+                         'delta': after - before})
+
+        return pd.DataFrame(rows, columns=['cycle', 'documents', 'changed', 'error_rate_before',
+                                           'error_rate_after', 'delta'])
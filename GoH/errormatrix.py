@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+The errormatrix module provides a compact, columnar alternative to the list of report
+dictionaries returned by :func:`GoH.reports.process_directory`.
+
+Each distinct error is stored once, in the error vocabulary, and the error counts of
+each document are kept as a row of a sparse document by error matrix. The remaining
+report fields are kept as columns of a dataframe. Summaries over the whole corpus are
+then column operations on the matrix rather than loops over millions of dictionaries.
+
+Examples:
+    >>> matrix = GoH.errormatrix.ErrorMatrix.from_reports(corpus_statistics)
+    >>> errors_summary = GoH.reports.get_errors_summary(matrix)
+    >>> GoH.reports.top_errors(errors_summary, 50)
+    >>> matrix.save('2017-05-corpus-errors.npz')
+"""
+from array import array
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+STAT_COLUMNS = ["doc_id", "error_rate", "num_tokens", "num_errors", "num_unique_tokens"]
+
+
+class ErrorMatrix(object):
+    """Document reports stored as a sparse matrix of integer-coded errors.
+
+    Args:
+        vocabulary (list): The distinct errors. The position of an error in the list is
+            its column in `counts`.
+        counts (scipy.sparse.csr_matrix): Count of each error (columns) in each document (rows).
+        stats (dataframe): One row per document, with the columns in `STAT_COLUMNS`.
+    """
+
+    def __init__(self, vocabulary, counts, stats):
+        self.vocabulary = vocabulary
+        self.counts = counts
+        self.stats = stats
+
+    @classmethod
+    def from_reports(cls, reports):
+        """Build the matrix from document reports.
+
+        The reports are consumed one at a time, so a generator of reports can be
+        converted without holding all of the report dictionaries in memory.
+
+        Args:
+            reports (iterable): Reports formatted as those of :func:`GoH.reports.process_directory`.
+
+        Returns:
+            ErrorMatrix: Matrix with the errors numbered in the order they are first seen.
+        """
+        error_ids = {}
+        indices = array('i')
+        data = array('i')
+        indptr = array('q', [0])
+        columns = {column: [] for column in STAT_COLUMNS}
+
+        for report in reports:
+            for error, count in report['errors'].items():
+                indices.append(error_ids.setdefault(error, len(error_ids)))
+                data.append(count)
+            indptr.append(len(indices))
+            for column in STAT_COLUMNS:
+                columns[column].append(report[column])
+
+        counts = sparse.csr_matrix((np.frombuffer(data, dtype=np.int32),
+                                    np.frombuffer(indices, dtype=np.int32),
+                                    np.frombuffer(indptr, dtype=np.int64)),
+                                   shape=(len(indptr) - 1, len(error_ids)))
+
+        return cls(list(error_ids), counts, pd.DataFrame(columns, columns=STAT_COLUMNS))
+
+    @classmethod
+    def load(cls, path):
+        """Load a matrix saved with :meth:`save`.
+
+        Args:
+            path (str): Location of the `.npz` file.
+
+        Returns:
+            ErrorMatrix: The saved matrix.
+        """
+        with np.load(path, allow_pickle=False) as f:
+            counts = sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+            vocabulary = _split_strings(f['vocabulary'])
+            stats = pd.DataFrame({'doc_id': _split_strings(f['doc_id'])}, columns=STAT_COLUMNS)
+            for column in STAT_COLUMNS[1:]:
+                stats[column] = f[column]
+
+        return cls(vocabulary, counts, stats)
+
+    def save(self, path):
+        """Save the matrix, vocabulary and document statistics to a single `.npz` file.
+
+        Args:
+            path (str): Location of the file.
+        """
+        columns = {column: self.stats[column].values for column in STAT_COLUMNS[1:]}
+        np.savez_compressed(path,
+                            data=self.counts.data,
+                            indices=self.counts.indices,
+                            indptr=self.counts.indptr,
+                            shape=np.array(self.counts.shape),
+                            vocabulary=_join_strings(self.vocabulary),
+                            doc_id=_join_strings(self.stats['doc_id']),
+                            **columns)
+
+    def summary(self):
+        """Total count of each error over all documents.
+
+        Returns:
+            Series: Error counts indexed by error, in vocabulary order. Can be used in place
+            of the dictionary returned by :func:`GoH.reports.get_errors_summary`.
+        """
+        totals = np.asarray(self.counts.sum(axis=0)).ravel()
+        return pd.Series(totals, index=pd.Index(self.vocabulary, dtype=object))
+
+    def doc_errors(self, doc_id):
+        """Return the errors of one document as a dictionary of errors and counts.
+
+        Args:
+            doc_id (str): Filename of the document.
+        """
+        row = self.stats.index[self.stats['doc_id'] == doc_id][0]
+        start, end = self.counts.indptr[row], self.counts.indptr[row + 1]
+        return {self.vocabulary[column]: int(count) for column, count in
+                zip(self.counts.indices[start:end], self.counts.data[start:end])}
+
+
+def _join_strings(strings):
+    # Errors and doc ids are whitespace-tokenized, so they never contain a newline.
+    return np.frombuffer('\n'.join(strings).encode('utf8'), dtype=np.uint8)
+
+
+def _split_strings(encoded):
+    text = encoded.tobytes().decode('utf8')
+    return text.split('\n') if text else []
@@ -8,6 +8,8 @@ Functions developed relying on the examples of
     http://radimrehurek.com/topic_modeling_tutorial/3%20-%20Indexing%20and%20Retrieval.html
 """
 
+import heapq
+import logging
 import os
 import sys
 import re
@@ -18,9 +20,9 @@ import gensim
 from gensim import utils
 from gensim.parsing.preprocessing import STOPWORDS
 from textblob import TextBlob
+import GoH.corpora
 import GoH.utilities
 from GoH.preprocess import ENTITIES
-from nltk.stem.wordnet import WordNetLemmatizer
 
 def process_page(page):
     """
@@ -68,29 +70,206 @@ def head(stream, n=10):
     return list(itertools.islice(stream, n))
 
 
-def best_phrases(document_stream, top_n=2000, prune_at=100000):
-    """Return a set of `top_n` most common noun phrases."""
-    np_counts = {}
-    for docno, doc in enumerate(document_stream):
-        # prune out infrequent phrases from time to time, to save RAM.
-        # the result may not be completely accurate because of this step
-        if docno % 1000 == 0:
-            sorted_phrases = sorted(np_counts.items(), key=lambda item: -item[1])
-            np_counts = dict(sorted_phrases[:prune_at])
+class SpaceSaving(object):
+    """Streaming counter of the most frequent items, in bounded memory (the Space-Saving
+    algorithm of Metwally, Agrawal and El Abbadi, 2005).
+
+    At most `capacity` items are counted. When a new item arrives and the counter is full,
+    it replaces the item with the smallest count, and inherits that count (recorded as its
+    `error`). After `n` items, with `m` = :attr:`min_count` (0 until the counter is full):
+
+    * ``count - error <= true count <= count`` for every item counted, and `error <= m`;
+    * an item that is not counted occurred at most `m` times;
+    * ``m <= n / capacity``, so every item occurring more than `n / capacity` times is counted.
+
+    Counters of separate parts of a stream (for example, counted in worker processes) are
+    combined with :meth:`merge`, which keeps the same bounds for the whole stream.
+
+    Args:
+        capacity (int): Maximum number of items counted.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.n = 0
+        self.counts = {}
+        self.errors = {}
+        self._buckets = {}
+        self._min = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def __getitem__(self, item):
+        return self.counts.get(item, 0)
+
+    @property
+    def min_count(self):
+        """Largest number of occurrences of an item that is not counted."""
+        return self._min if len(self.counts) >= self.capacity else 0
+
+    def _insert(self, item, count):
+        self.counts[item] = count
+        self._buckets.setdefault(count, {})[item] = None
+
+    def _remove(self, item):
+        count = self.counts.pop(item)
+        bucket = self._buckets[count]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[count]
+        return count
+
+    def add(self, item, count=1):
+        """Count `count` occurrences of an item."""
+        self.n += count
+        if item in self.counts:
+            old = self._remove(item)
+            self._insert(item, old + count)
+            if old == self._min and old not in self._buckets:
+                self._min = old + 1 if count == 1 else min(self._buckets)
+        elif len(self.counts) < self.capacity:
+            self._insert(item, count)
+            self.errors[item] = 0
+            self._min = count if len(self.counts) == 1 else min(self._min, count)
+        else:
+            # Replace the item counted for the longest time among those with the smallest count.
+            smallest = self._min
+            evicted = next(iter(self._buckets[smallest]))
+            self._remove(evicted)
+            del self.errors[evicted]
+            self._insert(item, smallest + count)
+            self.errors[item] = smallest
+            if smallest not in self._buckets:
+                self._min = smallest + 1 if count == 1 else min(self._buckets)
+
+    def update(self, items):
+        """Count one occurrence of each of the items."""
+        for item in items:
+            self.add(item)
+
+    def merge(self, other):
+        """Add the counts of another counter, as if its stream followed this one.
+
+        An item missing from one of the counters is given that counter's
+        :attr:`min_count`, both as count and as error. The `capacity` largest counts are
+        kept, so the bounds of the counter hold for the combined stream.
+
+        Returns:
+            SpaceSaving: This counter.
+        """
+        self_min, other_min = self.min_count, other.min_count
+        counts = {}
+        errors = {}
+        for item in itertools.chain(self.counts, other.counts):
+            if item not in counts:
+                counts[item] = self.counts.get(item, self_min) + other.counts.get(item, other_min)
+                errors[item] = self.errors.get(item, self_min) + other.errors.get(item, other_min)
+
+        self.n += other.n
+        self.counts = {}
+        self.errors = {}
+        self._buckets = {}
+        for item, count in heapq.nlargest(self.capacity, counts.items(), key=lambda item: item[1]):
+            self._insert(item, count)
+            self.errors[item] = errors[item]
+        if self._buckets:
+            self._min = min(self._buckets)
+        return self
+
+    def most_common(self, n=None):
+        """Return the `n` items with the largest counts (all if None), as (item, count)
+        tuples, from the most common. Items with equal counts are in the order first counted.
+        """
+        if n is None:
+            return sorted(self.counts.items(), key=lambda item: -item[1])
+        return heapq.nlargest(n, self.counts.items(), key=lambda item: item[1])
+
+
+def document_phrases(doc):
+    """Return the multi-word noun phrases of a document whose words are all alphabetic and
+    longer than two characters, as found by TextBlob.
+    """
+    phrases = []
+    for np in TextBlob(doc).noun_phrases:
+        # only consider multi-word NEs where each word contains at least one letter
+        if u' ' not in np:
+            continue
+        # ignore phrases that contain too short/non-alphabetic words
+        if all(word.isalpha() and len(word) > 2 for word in np.split()):
+            phrases.append(np)
+    return phrases
+
+
+_worker_capacity = None
+
+
+def _init_phrase_worker(capacity):
+    global _worker_capacity
+    _worker_capacity = capacity
+
+
+def _count_shard(documents):
+    counter = SpaceSaving(_worker_capacity)
+    for doc in documents:
+        counter.update(document_phrases(doc))
+    return len(documents), counter
+
+
+def _shards(document_stream, shard_size):
+    documents = iter(document_stream)
+    while True:
+        shard = list(itertools.islice(documents, shard_size))
+        if not shard:
+            return
+        yield shard
+
+
+def best_phrases(document_stream, top_n=2000, prune_at=100000, workers=None, shard_size=1000):
+    """Return a set of `top_n` most common noun phrases.
+
+    The phrases are counted with a :class:`SpaceSaving` counter of `prune_at` phrases, so
+    memory stays bounded however long the stream is. Every phrase occurring more than
+    `n / prune_at` times, for `n` phrases in the stream, is counted, and its count is too
+    high by at most that much.
+
+    Args:
+        document_stream (iterable): Content of the documents.
+        top_n (int): Number of phrases returned.
+        prune_at (int): Maximum number of phrases counted.
+        workers (int): Number of worker processes. None (default) or 1 counts the phrases
+            in the calling process. Otherwise each worker counts shards of `shard_size`
+            documents, and the counters of the shards are merged.
+        shard_size (int): Number of documents counted by a worker at a time.
+
+    Returns:
+        set: The phrases.
+    """
+    counter = SpaceSaving(prune_at)
+    if workers is None or workers == 1:
+        for docno, doc in enumerate(document_stream):
+            if docno % 1000 == 0:
+                logging.info("at document #%i, considering %i phrases: %s..." %
+                             (docno, len(counter), counter.most_common(10)))
+            counter.update(document_phrases(doc))
+    else:
+        shards = GoH.utilities.parallel_imap(_count_shard, _shards(document_stream, shard_size),
+                                             workers=workers,
+                                             chunksize=1,
+                                             initializer=_init_phrase_worker,
+                                             initargs=(prune_at,))
+        docno = 0
+        for documents, shard in shards:
+            docno += documents
+            counter.merge(shard)
             logging.info("at document #%i, considering %i phrases: %s..." %
-                         (docno, len(np_counts), head(sorted_phrases)))
-        
-        # how many times have we seen each noun phrase?
-        for np in TextBlob(doc).noun_phrases:
-            # only consider multi-word NEs where each word contains at least one letter
-            if u' ' not in np:
-                continue
-            # ignore phrases that contain too short/non-alphabetic words
-            if all(word.isalpha() and len(word) > 2 for word in np.split()):
-                np_counts[np] = np_counts.get(np, 0) + 1
+                         (docno, len(counter), counter.most_common(10)))
 
-    sorted_phrases = sorted(np_counts, key=lambda np: -np_counts[np])
-    return set(head(sorted_phrases, top_n))
+    logging.info("counted %i phrases, counts exact to within %i" % (counter.n, counter.min_count))
+    return set(phrase for phrase, count in counter.most_common(top_n))
 
 
 def get_entities(filepath):
@@ -100,7 +279,7 @@ def get_entities(filepath):
         return f.read().splitlines()
 
 
-def tokenize(message, lemmatize=True, tokenizer='whitespace', entities=ENTITIES, stopwords=STOPWORDS):
+def tokenize(message, lemmatize=True, tokenizer='whitespace', entities=ENTITIES, stopwords=STOPWORDS, joiner=None, lemma_cache=None):
     """
     Break text (string) into a list of Unicode tokens.
     
@@ -113,26 +292,32 @@ def tokenize(message, lemmatize=True, tokenizer='whitespace', entities=ENTITIES,
             between the whitespace tokenizer (default) and the NLTK word tokenizer.
         entities(str) : List of noun phrases saved
         stopwords(str) : List of stopwords, currently the defaults from Gensim.
+        joiner(PhraseJoiner) : Join the phrases with a :class:`GoH.corpora.PhraseJoiner`
+            instead of looking for them among the TextBlob noun phrases.
+        lemma_cache(LemmaCache) : Cache of lemmas. Defaults to the process-wide
+            :data:`GoH.corpora.LEMMA_CACHE`.
     Returns:
         list: List of tokens in the text.
     """
-    phrases = []
-            
-    for np in TextBlob(message).noun_phrases:
-        if ' ' in np and np in entities:            
-            phrases.append(np)
+    if joiner is not None:
+        message = joiner.join(message)
+    else:
+        phrases = []
 
-    message = message.lower()
-    
-    for phrase in phrases:
-        replacement_phrase = re.sub('\s', '_', phrase)
-        message = re.sub(phrase, replacement_phrase, message)
+        for np in TextBlob(message).noun_phrases:
+            if ' ' in np and np in entities:
+                phrases.append(np)
+
+        message = message.lower()
+
+        for phrase in phrases:
+            replacement_phrase = re.sub('\s', '_', phrase)
+            message = re.sub(phrase, replacement_phrase, message)
         
     tokens = GoH.utilities.tokenize_text(message, tokenizer)
     
     if lemmatize:
-        lemmatizer = WordNetLemmatizer()
-        tokens = [lemmatizer.lemmatize(token) for token in tokens]
+        tokens = GoH.corpora.lemmatize_tokens(tokens, lemma_cache)
     
     token_list = []
     for token in tokens:
@@ -144,13 +329,26 @@ def tokenize(message, lemmatize=True, tokenizer='whitespace', entities=ENTITIES,
 
 
 class Tokenized_Corpus(object):
+    """Yields the title and the tokens (see :func:`tokenize`) of each page of a corpus archive.
+
+    With `workers`, the pages are tokenized in a pool of worker processes and yielded in
+    corpus order, see :func:`GoH.corpora.iter_processed`.
+    """
     
-    def __init__(self, fname, lemmatize, tokenizer):
+    def __init__(self, fname, lemmatize, tokenizer, joiner=None, workers=None, chunksize=100, max_in_flight=None,
+                 lemma_cache=None):
         self.fname = fname
         self.tokenizer = tokenizer
         self.lemmatize = lemmatize
+        self.joiner = joiner
+        self.lemma_cache = lemma_cache
+        self.workers = workers
+        self.chunksize = chunksize
+        self.max_in_flight = max_in_flight
 
+    def process_corpus(self, message):
+        return tokenize(message, self.lemmatize, self.tokenizer, joiner=self.joiner, lemma_cache=self.lemma_cache)
         
     def __iter__(self):
-        for title, message in iter_Periodicals(self.fname):
-            yield title, tokenize(message, self.lemmatize, self.tokenizer)
\ No newline at end of file
+        return GoH.corpora.iter_processed(self, iter_Periodicals(self.fname),
+                                          self.workers, self.chunksize, self.max_in_flight)
\ No newline at end of file
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 
+from array import array
 import GoH.utilities
+from math import inf, log
+import numpy as np
 import operator
 from pyxdameraulevenshtein import normalized_damerau_levenshtein_distance
+import zlib
 
 
 def get_approved_tokens(content, spelling_dictionary, verified_tokens):
@@ -65,6 +69,108 @@ def infer_spaces(s, wordcost, maxword):
     return " ".join(reversed(out))
 
 
+def zipf_word_costs(WORDS):
+    """Build the cost model of `infer_spaces` from word counts.
+
+    Words are ranked from most to least frequent and, assuming Zipf's law, the cost
+    of the word of rank r (its negative log probability) is log(r * log(number of words)).
+    The number of words is taken to be at least 2, so that the costs are defined for
+    a single word.
+
+    Args:
+        WORDS (Counter): Word counts. Ties are ranked alphabetically.
+
+    Returns:
+        dict: Cost of each word.
+    """
+    ranked = sorted(WORDS, key=lambda word: (-WORDS[word], word))
+    log_size = log(max(len(ranked), 2))
+    return {word: log((rank + 1) * log_size) for rank, word in enumerate(ranked)}
+
+
+class WordSegmenter(object):
+    """Splits strings without spaces into words, with the same results as `infer_spaces`.
+
+    The words are stored in a trie of their reversed characters. Finding the words that
+    end at a position walks the trie backwards from that position, so only substrings
+    that are the end of some word are ever looked at, and a walk stops as soon as no
+    word matches. The best split length of each position is kept, so the words are
+    recovered without searching again. Segmentations are memoized by string, as the
+    same run-together tokens are found on many pages.
+
+    Usage::
+
+        >>> segmenter = WordSegmenter.from_counts(WORDS)
+        >>> segmenter.segment('thelordisrisen')
+        'the lord is risen'
+        >>> segmenter.segment_batch(long_errors(errors_summary)[0])
+
+    Args:
+        wordcost (dict): Cost of each word, as for `infer_spaces`.
+    """
+
+    def __init__(self, wordcost):
+        self.trie = {}
+        for word, cost in wordcost.items():
+            node = self.trie
+            for character in reversed(word):
+                node = node.setdefault(character, {})
+            node[None] = cost
+        self.memo = {}
+
+    @classmethod
+    def from_counts(cls, WORDS):
+        """Build a segmenter with the costs of `zipf_word_costs`."""
+        return cls(zipf_word_costs(WORDS))
+
+    def split(self, s):
+        """Return the words of the minimal-cost split of `s`.
+
+        Characters that no word can cover are split off one at a time, as in `infer_spaces`.
+        """
+        trie = self.trie
+        cost = [0]
+        length = [0]
+        for i in range(1, len(s) + 1):
+            best, best_k = inf, 1
+            node = trie
+            j = i
+            while j > 0:
+                node = node.get(s[j - 1])
+                if node is None:
+                    break
+                j -= 1
+                word_cost = node.get(None)
+                if word_cost is not None and cost[j] + word_cost < best:
+                    best, best_k = cost[j] + word_cost, i - j
+            cost.append(best)
+            length.append(best_k)
+
+        words = []
+        i = len(s)
+        while i > 0:
+            words.append(s[i - length[i]:i])
+            i -= length[i]
+        words.reverse()
+        return words
+
+    def segment(self, s):
+        """Return `s` with spaces between the inferred words (memoized)."""
+        try:
+            return self.memo[s]
+        except KeyError:
+            segmented = self.memo[s] = " ".join(self.split(s))
+            return segmented
+
+    def segment_batch(self, strings):
+        """Segment many strings, such as the errors returned by `GoH.reports.long_errors`.
+
+        Returns:
+            list: The segmented strings, in the order of `strings`.
+        """
+        return [self.segment(s) for s in strings]
+
+
 def check_probability(word, WORDS):
     N = sum(WORDS.values())
     return WORDS[word]/N
@@ -87,6 +193,96 @@ def check_for_substitutes(error, spelling_dictionary, WORDS):
                 pass
     return sorted(potential_subs.items(), key=operator.itemgetter(1), reverse=True)
 
+def _deletes(word, depth):
+    """Return the strings formed by deleting up to `depth` characters from `word`."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i+1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+def _variant_hash(variant):
+    # CRC-32 rather than `hash`, so the index can be used in other processes. Strings
+    # that share a hash only add candidates, which are then checked in full.
+    return zlib.crc32(variant.encode('utf8'))
+
+
+class SubstituteIndex(object):
+    """Symmetric-delete index of a spelling dictionary, for finding the substitutes
+    of many errors without comparing each error to every word in the dictionary.
+
+    `check_for_substitutes` keeps a word if its normalized Damerau-Levenshtein distance
+    to the error is below .20, which limits the number of edits to (length - 1) // 5 of 
+    the longer string. Each edit (including a transposition) removes at most one 
+    character from each string on the way to a common string, so every such word 
+    shares a string of up to that many deletions with the error. The index holds the
+    hashes of those deletions for every word; a lookup only measures the distance to 
+    the words that share one with the error.
+
+    `substitutes` returns the same ranked list as `check_for_substitutes`, including
+    the order of ties, as the candidates are checked in the order of the dictionary.
+    The probabilities of the words are computed once, when the index is built.
+
+    Args:
+        spelling_dictionary (set): The set of verified words. It should not be changed
+            after the index is built.
+        WORDS (Counter): Word counts used to rank the substitutes.
+        max_distance (int): Deepest deletion indexed. Errors with 5 * (max_distance + 1)
+            or more characters are compared to every word, as in `check_for_substitutes`.
+    """
+
+    def __init__(self, spelling_dictionary, WORDS, max_distance=2):
+        self.words = list(spelling_dictionary)
+        self.max_distance = max_distance
+
+        total = sum(WORDS.values())
+        self.probabilities = {word: count/total for word, count in WORDS.items()}
+
+        keys = array('q')
+        word_ids = array('i')
+        for word_id, word in enumerate(self.words):
+            for variant in _deletes(word, min(len(word) // 5, max_distance)):
+                keys.append(_variant_hash(variant))
+                word_ids.append(word_id)
+
+        keys = np.frombuffer(keys, dtype=np.int64)
+        order = np.argsort(keys, kind='mergesort')
+        self.keys = keys[order]
+        self.word_ids = np.frombuffer(word_ids, dtype=np.int32)[order]
+
+    def candidates(self, error):
+        """Return the positions in `words` of the words that may be substitutes, in order."""
+        depth = len(error) // 5
+        if depth > self.max_distance:
+            return range(len(self.words))
+
+        hashes = np.array([_variant_hash(variant) for variant in _deletes(error, depth)], dtype=np.int64)
+        starts = np.searchsorted(self.keys, hashes, side='left')
+        ends = np.searchsorted(self.keys, hashes, side='right')
+        found = [self.word_ids[start:end] for start, end in zip(starts, ends) if end > start]
+        if not found:
+            return []
+
+        return np.unique(np.concatenate(found)).tolist()
+
+    def substitutes(self, error):
+        """Return the ranked substitutes for an error, as `check_for_substitutes`."""
+        potential_subs = {}
+        range = (len(error) - 2, len(error) + 2)
+        for word_id in self.candidates(error):
+            word = self.words[word_id]
+            if range[0] < len(word) < range[1]:
+                distance = normalized_damerau_levenshtein_distance(error, word)
+                if distance < .20:
+                    if self.probabilities.get(word, 0) > .000001:
+                        potential_subs.update({word: self.probabilities[word]})
+                    elif self.probabilities.get(word.title(), 0) > .000001:
+                        potential_subs.update({word.title(): self.probabilities[word.title()]})
+        return sorted(potential_subs.items(), key=operator.itemgetter(1), reverse=True)
+
+
 # def interactive_check(error, subs):
 #
 #     print("Error = {}: Substitution = {}".format(error, word))
@@ -120,11 +316,89 @@ def run_spell_check_program(errors, spelling_dictionary, c):
     return replacements
 
 
-def auto_spell_check(errors, spelling_dictionary, WORDS):
+def auto_spell_check(errors, spelling_dictionary, WORDS, index=None):
+    """Pair each error with its most probable substitute.
+
+    Uses a `SubstituteIndex` of the dictionary (built here if `index` is None) to 
+    find the same substitutes as `check_for_substitutes`.
+    """
+    if index is None:
+        index = SubstituteIndex(spelling_dictionary, WORDS)
+
     replacements = []
     for error in errors:
         if 2 < len(error) < 15:
-            found_subs = check_for_substitutes(error, spelling_dictionary, WORDS)
+            found_subs = index.substitutes(error)
             if len(found_subs) > 0:
                 replacements.append((error, found_subs[0][0]))
     return replacements
+
+
+_worker_index = None
+
+
+def _init_spell_worker(index):
+    global _worker_index
+    _worker_index = index
+
+
+def _best_substitute(error):
+    found_subs = _worker_index.substitutes(error)
+    return error, found_subs[0][0] if found_subs else None
+
+
+def batch_spell_check(errors, spelling_dictionary, WORDS, workers=None, chunksize=500, cache=None, index=None):
+    """Pair each distinct error with its most probable substitute, as `auto_spell_check`.
+
+    Errors are deduplicated before they are checked. With a `GoH.cache.SubstituteCache`,
+    the decision for every checked error (including errors without a substitute) is
+    stored, and only errors that have never been checked with the same dictionary and
+    word counts are searched. The index is only built if there are such errors.
+
+    Usage::
+
+        >>> cache = GoH.cache.SubstituteCache('substitutes.json', spelling_dictionary, WORDS)
+        >>> replacements = batch_spell_check(errors, spelling_dictionary, WORDS, workers=4, cache=cache)
+
+    Args:
+        errors (iterable): Errors to correct. May contain duplicates.
+        spelling_dictionary (set): The set of verified words.
+        WORDS (Counter): Word counts used to rank the substitutes.
+        workers (int): Number of worker processes searching for substitutes. Each worker
+            receives the index once. Errors are searched in this process if None.
+        chunksize (int): Number of errors sent to a worker at a time.
+        cache (SubstituteCache): Store of previous decisions. Saved before returning.
+        index (SubstituteIndex): Index of the dictionary, to reuse between calls.
+
+    Returns:
+        list: (error, substitute) tuples for the errors with a substitute, in the order
+        the errors are first seen.
+    """
+    errors = [error for error in dict.fromkeys(errors) if 2 < len(error) < 15]
+
+    decisions = {}
+    unseen = []
+    for error in errors:
+        if cache is not None and error in cache:
+            decisions[error] = cache.get(error)
+        else:
+            unseen.append(error)
+
+    if unseen:
+        if index is None:
+            index = SubstituteIndex(spelling_dictionary, WORDS)
+        if workers:
+            found = GoH.utilities.parallel_imap(_best_substitute, unseen, workers=workers, chunksize=chunksize,
+                                                initializer=_init_spell_worker, initargs=(index,))
+        else:
+            _init_spell_worker(index)
+            found = map(_best_substitute, unseen)
+        decisions.update(found)
+
+    if cache is not None:
+        for error in unseen:
+            cache.put(error, decisions[error])
+        cache.save()
+        print("Substitute cache: {} hits, {} misses".format(len(errors) - len(unseen), len(unseen)))
+
+    return [(error, decisions[error]) for error in errors if decisions[error] is not None]
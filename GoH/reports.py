@@ -6,12 +6,16 @@ from nltk import FreqDist
 from GoH import utilities
 from GoH import reports
 from GoH import charts
+from GoH import archive
+from GoH.cache import ReportCache, content_hash
+from GoH.errormatrix import ErrorMatrix
 import pandas as pd
 import numpy as np
+import itertools
 import operator
 from bokeh.plotting import figure, output_file, output_notebook, save, show
 import re
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 
 
@@ -108,30 +112,266 @@ def generate_doc_report(text, spelling_dictionary):
              'errors': error_report}
 
 
-def process_directory(directory, spelling_dictionary):
+# Translation table with the same effect as `GoH.utilities.strip_punct`.
+_PUNCT_TABLE = str.maketrans('0123456789,.!?$:;&"', ' ' * 19)
+
+
+def fast_doc_report(text, spelling_dictionary):
+    """
+    Creates the same report as `generate_doc_report` with one pass over the text.
+
+    The punctuation is removed with `str.translate`, the text is lowercased and 
+    split on whitespace once, and the tokens are counted with a single `Counter`.
+    Errors are found by checking each distinct token against the dictionary, rather 
+    than building the intermediate sets and the `FreqDist` of `generate_doc_report`.
+
+    Equivalence: for every text and dictionary, the returned dictionary is equal to 
+    the one returned by `generate_doc_report` (the `errors` may be in a different 
+    order). `str.split` and the `WhitespaceTokenizer` split on the same characters, 
+    and lowercasing never creates whitespace or punctuation, so lowercasing the 
+    whole text before splitting yields the same tokens. The one exception is the 
+    ASCII separator characters \\x1c-\\x1f, which `str.split` treats as whitespace
+    but the `regex`-based tokenizer of recent NLTK releases does not.
+
+    Arguments:
+    - text -- the content of the file being evaluated
+    - spelling_dictionary -- a set containing the collection of verified words.
+    """
+    tokens = text.translate(_PUNCT_TABLE).lower().split()
+    counts = Counter(tokens)
+    error_report = {token: count for token, count in counts.items() 
+                    if token not in spelling_dictionary}
+    error_total = total_errors(error_report)
+    return {'num_tokens': len(tokens),
+             'num_unique_tokens': len(counts),
+             'num_errors': error_total,
+             'error_rate': error_rate(error_total, tokens),
+             'errors': error_report}
+
+
+def list_documents(directory):
+    """
+    Returns the names of the files in a directory, skipping hidden files, 
+    sorted so that every run processes and reports documents in the same order.
+
+    Arguments:
+    - directory -- the location of the directory of files to evaluate.
+    """
+    return sorted(f for f in listdir(directory) if not f.startswith('.') and isfile(join(directory, f)))
+
+
+# Spelling dictionary of a worker process, set once by `_init_worker` so that 
+# the dictionary is not pickled with every document.
+_worker_dictionary = None
+
+
+def _init_worker(spelling_dictionary):
+    global _worker_dictionary
+    _worker_dictionary = spelling_dictionary
+
+
+def _report_file(location, spelling_dictionary=None):
+    directory, document = location
+    if spelling_dictionary is None:
+        spelling_dictionary = _worker_dictionary
+    content = utilities.readfile(directory, document)
+    stats = fast_doc_report(content, spelling_dictionary)
+    stats.update({"doc_id": document})
+    return content_hash(content), stats
+
+
+def _score_documents(directory, documents, spelling_dictionary, workers=None, chunksize=100):
+    """
+    Yields the content hash and the report of each document, in order, scoring 
+    them in the calling process or in a pool of `workers` processes.
+    """
+    locations = ((directory, document) for document in documents)
+    if workers is None or workers == 1:
+        return (_report_file(location, spelling_dictionary) for location in locations)
+
+    return utilities.parallel_imap(_report_file, locations,
+                                   workers=workers,
+                                   chunksize=chunksize,
+                                   initializer=_init_worker,
+                                   initargs=(spelling_dictionary,))
+
+
+def process_directory(directory, spelling_dictionary, workers=None, chunksize=100, cache=None):
     """ 
     Composit function for processing an entire directory of files.
-    Returns the statistics on the whole directory as a list of dictionaries.
+    Returns the statistics on the whole directory as a list of dictionaries,
+    ordered by doc_id.
+
+    With `workers` set, the documents are read and scored in a pool of worker 
+    processes. Each worker receives the spelling dictionary once, when it starts,
+    and the reports are returned in the same order as in a serial run.
+
+    With a `cache`, only the documents whose content is not in the cache are scored; 
+    the others are taken from the cache, and the new reports are added to it. The 
+    number of cache hits and misses is printed at the end of the run.
 
     Uses the following functions:
         - `GoH.utilities.readfile`
-        - `GoH.reports.generate_doc_report`
+        - `GoH.reports.fast_doc_report`
+        - `GoH.utilities.parallel_imap`
+        - `GoH.cache.ReportCache`
 
     Arguments:
     - directory -- the location of the directory of files to evaluate.
     - spelling_dictionary -- the set containing all verified words against which
     the document is evaluated.
+    - workers -- number of worker processes. None (default) or 1 processes the
+    documents in the calling process.
+    - chunksize -- number of documents sent to a worker at a time.
+    - cache -- a `GoH.cache.ReportCache`, or the path of the cache file to use.
     """
-    corpus = (f for f in listdir(directory) if not f.startswith('.') and isfile(join(directory, f)))
-        
-    statistics = []
+    return list(iter_reports(directory, spelling_dictionary, workers, chunksize, cache))
+
+
+def iter_reports(directory, spelling_dictionary, workers=None, chunksize=100, cache=None):
+    """
+    Generator version of `process_directory`: yields the report of each document, 
+    ordered by doc_id, as soon as it is scored. Takes the same arguments.
+
+    With a `cache`, the content of every document is hashed first to find the cached
+    reports; the cache is saved, and the hits and misses printed, once all the reports
+    have been yielded.
+    """
+    corpus = list_documents(directory)
+
+    if cache is None:
+        for key, stats in _score_documents(directory, corpus, spelling_dictionary, workers, chunksize):
+            yield stats
+        return
+
+    if not isinstance(cache, ReportCache):
+        cache = ReportCache(cache, spelling_dictionary)
+
+    cached = []
+    changed = []
     for document in corpus:
-        content = utilities.readfile(directory, document)
-        stats = generate_doc_report(content, spelling_dictionary)
+        report = cache.get(content_hash(utilities.readfile(directory, document)))
+        if report is None:
+            changed.append(document)
+        cached.append(report)
+
+    scored = _score_documents(directory, changed, spelling_dictionary, workers, chunksize)
+    for document, report in zip(corpus, cached):
+        if report is None:
+            key, stats = next(scored)
+            cache.put(key, stats)
+            yield stats
+        else:
+            yield dict(report, errors=dict(report['errors']), doc_id=document)
+    cache.save()
+
+    print("Report cache: {} hits, {} misses".format(len(corpus) - len(changed), len(changed)))
+
+
+def process_directory_batches(directory, spelling_dictionary, batch_size=1000, workers=None, chunksize=100, cache=None):
+    """
+    Processes a directory like `process_directory`, but yields the statistics in 
+    lists of `batch_size` reports, so that downstream summaries can be updated while
+    the directory is processed, and only one batch of reports is in memory at a time.
+
+    Arguments:
+    - directory -- the location of the directory of files to evaluate.
+    - spelling_dictionary -- the set containing all verified words against which
+    the document is evaluated.
+    - batch_size -- number of reports in each batch.
+    - workers, chunksize, cache -- as for `process_directory`.
+    """
+    reports = iter_reports(directory, spelling_dictionary, workers, chunksize, cache)
+    while True:
+        batch = list(itertools.islice(reports, batch_size))
+        if not batch:
+            break
+        yield batch
+
+
+def process_directory_matrix(directory, spelling_dictionary, workers=None, chunksize=100, cache=None):
+    """
+    Processes a directory like `process_directory`, but returns the statistics as a 
+    `GoH.errormatrix.ErrorMatrix`. The reports are added to the matrix as they are 
+    scored, so the report dictionaries of the whole directory are never in memory at once.
+
+    Arguments:
+    - directory -- the location of the directory of files to evaluate.
+    - spelling_dictionary -- the set containing all verified words against which
+    the document is evaluated.
+    - workers -- number of worker processes. None (default) or 1 processes the
+    documents in the calling process.
+    - chunksize -- number of documents sent to a worker at a time.
+    - cache -- a `GoH.cache.ReportCache`, or the path of the cache file to use.
+    """
+    return ErrorMatrix.from_reports(iter_reports(directory, spelling_dictionary, workers, chunksize, cache))
+
+
+def _report_pages(fname, entries, spelling_dictionary=None):
+    if spelling_dictionary is None:
+        spelling_dictionary = _worker_dictionary
+    statistics = []
+    for document, content in archive.iter_pages(fname, entries=entries):
+        stats = fast_doc_report(content, spelling_dictionary)
         stats.update({"doc_id": document})
         statistics.append(stats)
- 
-    return(statistics) 
+    return statistics
+
+
+def _report_page(page):
+    document, content = page
+    stats = fast_doc_report(content, _worker_dictionary)
+    stats.update({"doc_id": document})
+    return stats
+
+
+def _report_archive_range(job):
+    fname, entries = job
+    return _report_pages(fname, entries)
+
+
+def process_archive(fname, spelling_dictionary, names=None, workers=None):
+    """
+    Processes the pages of a corpus archive (such as the .tar.gz read by 
+    `GoH.corpora.iter_Periodicals`) without extracting it. Returns the statistics
+    as a list of dictionaries, ordered by doc_id, like `process_directory`. The 
+    doc_id of a page is the basename of its archive member.
+
+    Pages are located with the member index of `GoH.archive`, which is built on the 
+    first run. Hidden files are skipped, as in `process_directory`. With `workers` set,
+    the archive is split into one range of pages per worker, and each worker reads its
+    own range. A gzip archive can only be read that way with `indexed_gzip` installed
+    (see `GoH.archive.seekable`); otherwise every worker would decompress the stream up
+    to its range, so the pages are read in a single pass by the calling process and
+    only scored by the workers.
+
+    Arguments:
+    - fname -- path to the tar archive.
+    - spelling_dictionary -- the set containing all verified words against which
+    the document is evaluated.
+    - names -- doc_ids (or member names) of the pages to process. All pages if None.
+    - workers -- number of worker processes. None (default) or 1 processes the
+    pages in the calling process.
+    """
+    entries = archive.select_members(archive.load_index(fname), names)
+
+    if workers is None or workers == 1:
+        statistics = _report_pages(fname, entries, spelling_dictionary)
+    elif not archive.seekable(fname):
+        statistics = list(utilities.parallel_imap(_report_page, archive.iter_pages(fname, entries=entries),
+                                                  workers=workers,
+                                                  initializer=_init_worker,
+                                                  initargs=(spelling_dictionary,)))
+    else:
+        jobs = ((fname, pages) for pages in archive.split_ranges(entries, workers))
+        statistics = [stats for pages in utilities.parallel_imap(_report_archive_range, jobs,
+                                                                 workers=workers,
+                                                                 chunksize=1,
+                                                                 initializer=_init_worker,
+                                                                 initargs=(spelling_dictionary,))
+                      for stats in pages]
+
+    return sorted(statistics, key=operator.itemgetter('doc_id'))
 
 
 def get_errors_summary(statistics):
@@ -141,7 +381,13 @@ def get_errors_summary(statistics):
     that records the error (as key) and the total count for that error (as value).
     Developed using: http://stackoverflow.com/questions/11011756, 
     http://stackoverflow.com/questions/27801945/
+
+    Given a `GoH.errormatrix.ErrorMatrix`, returns its column totals as a Series 
+    indexed by error, which the functions below handle as column operations.
     """
+    if isinstance(statistics, ErrorMatrix):
+        return statistics.summary()
+
     all_errors = (report['errors'] for report in statistics)       
     
     errors_summary = defaultdict(int)
@@ -156,6 +402,9 @@ def top_errors(errors_summary, min_count):
     """ 
     Use the errors_summary to report the top errors.
     """
+    if isinstance(errors_summary, pd.Series):
+        frequent_errors = errors_summary[errors_summary > min_count]
+        return _sorted_pairs(frequent_errors)
 
     # Subset errors_summary using the min_count
     frequent_errors = {key: value for key, value in errors_summary.items() if value > min_count}
@@ -173,12 +422,20 @@ def long_errors(errors_summary, min_length=10):
     Arguments:
     - errors_summary -- 
     """
+    if isinstance(errors_summary, pd.Series):
+        errors = errors_summary.index
+        return (errors[errors.str.len() > min_length].tolist(), min_length)
+
     errors = list(errors_summary.keys())
 
     return ([x for x in errors if len(x) > min_length], min_length)
 
 
 def tokens_with_special_characters(errors_summary):
+    if isinstance(errors_summary, pd.Series):
+        special_characters = errors_summary.index.str.contains("[^a-z0-9-']", regex=True)
+        return _sorted_pairs(errors_summary[special_characters])
+
     errors = list(errors_summary.keys())
 
     special_characters = []
@@ -193,30 +450,86 @@ def tokens_with_special_characters(errors_summary):
     return sorted(sc_dict.items(), key=operator.itemgetter(1), reverse=True)
 
 
-def docs_with_high_error_rate(corpus_statistics, min_error_rate=.2):
-    # Gather list of doc_id and num_errors
-    docs_2_errors = {}
-    for report in corpus_statistics:
-        docs_2_errors.update({report['doc_id']: report['error_rate']})
+def _sorted_pairs(errors_summary):
+    # Same order as sorting the (error, count) pairs of the summary dictionary
+    # with `sorted`: by count, descending, with ties kept in summary order.
+    ranked = errors_summary.sort_values(ascending=False, kind='mergesort')
+    return list(zip(ranked.index.tolist(), ranked.tolist()))
 
-    # Subset dictionary to get only records with error_rate above minimum
-    problem_docs = {key: value for key, value in docs_2_errors.items() if value > min_error_rate}
 
-    # return dictionary with doc_id and error_count if error rate higher than min_error_rate
-    return sorted(problem_docs.items(), key=operator.itemgetter(1), reverse=True)
+def query_docs(corpus_statistics, min_error_rate=None, max_error_rate=None, min_tokens=None, 
+               max_tokens=None, titles=None, years=None, sort_by=None, ascending=False):
+    """
+    Select the documents that meet all of the given conditions, using vectorized 
+    comparisons over the statistics dataframe. Conditions left as None are not applied.
 
+    The result can be used to pick a sample for `GoH.utilities.create_tar_files`::
+
+        >>> docs = query_docs(df, max_error_rate=.1, min_tokens=350)
+        >>> select_list = docs['doc_id'].tolist()
+
+    Arguments:
+    - corpus_statistics -- the statistics dataframe (see `GoH.utilities.stats_to_df`), 
+    or the list of reports from `process_directory`.
+    - min_error_rate -- keep documents with an error rate above this value.
+    - max_error_rate -- keep documents with an error rate below this value.
+    - min_tokens -- keep documents with more tokens than this value.
+    - max_tokens -- keep documents with fewer tokens than this value.
+    - titles -- keep documents of these titles (see `GoH.utilities.get_title`).
+    - years -- keep documents of these years (see `GoH.utilities.parse_page_ids`).
+    - sort_by -- column to sort the result by. The result keeps the order of the 
+    statistics if None.
+    - ascending -- sort in ascending order.
+
+    Returns a dataframe with the rows of the selected documents.
+    """
+    if isinstance(corpus_statistics, pd.DataFrame):
+        df = corpus_statistics
+    else:
+        df = utilities.stats_to_df(corpus_statistics)
+
+    mask = np.ones(len(df.index), dtype=bool)
+    if min_error_rate is not None:
+        mask &= (df['error_rate'] > min_error_rate).values
+    if max_error_rate is not None:
+        mask &= (df['error_rate'] < max_error_rate).values
+    if min_tokens is not None:
+        mask &= (df['num_tokens'] > min_tokens).values
+    if max_tokens is not None:
+        mask &= (df['num_tokens'] < max_tokens).values
+    if titles is not None or years is not None:
+        parts = utilities.parse_page_ids(df['doc_id'])
+        if titles is not None:
+            mask &= parts['title'].isin(list(titles)).values
+        if years is not None:
+            mask &= parts['year'].isin([int(year) for year in years]).values
+
+    selected = df[mask]
+    if sort_by is not None:
+        selected = selected.sort_values(sort_by, ascending=ascending, kind='mergesort')
+
+    return selected
+
+
+def docs_with_high_error_rate(corpus_statistics, min_error_rate=.2):
+    """
+    Returns the doc_id and error rate of the documents with an error rate above
+    `min_error_rate`, sorted by error rate (highest first). See `query_docs`.
+    """
+    problem_docs = query_docs(corpus_statistics, min_error_rate=min_error_rate,
+                              sort_by='error_rate', ascending=False)
+
+    return list(zip(problem_docs['doc_id'].tolist(), problem_docs['error_rate'].tolist()))
 
-def docs_with_low_token_count(corpus_statistics, max_token_count=350):
-    # Gather list of doc_ids and total token count
-    docs_2_tokens = {}
-    for report in corpus_statistics:
-        docs_2_tokens.update({report['doc_id']: report['num_tokens']})
 
-    # Subset dictionary to get only records wth value below the max
-    short_docs = {key: value for key, value in docs_2_tokens.items() if value < max_token_count}
+def docs_with_low_token_count(corpus_statistics, max_token_count=350):
+    """
+    Returns a dictionary of the doc_id and token count of the documents with fewer
+    than `max_token_count` tokens, and the `max_token_count`. See `query_docs`.
+    """
+    short_docs = query_docs(corpus_statistics, max_tokens=max_token_count)
 
-    # return dictionary with doc_id and token_count if count is lower than max_token_count
-    return (short_docs, max_token_count)
+    return (dict(zip(short_docs['doc_id'].tolist(), short_docs['num_tokens'].tolist())), max_token_count)
 
 
 def token_count(df):
@@ -242,8 +555,69 @@ def average_error_rate(df):
     return error_sum/total_docs
 
 
-def overview_report(directory, spelling_dictionary, title):
-    corpus_statistics = process_directory(directory, spelling_dictionary)
+class RunningStats(object):
+    """
+    Running totals over batches of document reports, such as the batches of 
+    `process_directory_batches`. After each `update`, `token_count`, 
+    `average_verified_rate` and `average_error_rate` return the same values as the 
+    functions of the same name on the dataframe of all the reports seen so far 
+    (up to floating point rounding in the sum of the error rates).
+    """
+
+    def __init__(self):
+        self.num_docs = 0
+        self.total_tokens = 0
+        self.total_errors = 0
+        self.error_rate_sum = 0.0
+        self.frames = []
+
+    def update(self, batch):
+        """
+        Adds a batch of reports to the totals and returns its dataframe 
+        (see `GoH.utilities.stats_to_df`).
+        """
+        df = utilities.stats_to_df(batch)
+        self.num_docs += len(df.index)
+        self.total_tokens += df['num_tokens'].sum()
+        self.total_errors += df['num_errors'].sum()
+        self.error_rate_sum += df['error_rate'].sum()
+        self.frames.append(df)
+        return df
+
+    def token_count(self):
+        return self.total_tokens
+
+    def average_verified_rate(self):
+        if self.total_tokens > 0:
+            return (self.total_tokens - self.total_errors)/self.total_tokens
+        else:
+            return np.nan
+
+    def average_error_rate(self):
+        if self.num_docs > 0:
+            return self.error_rate_sum/self.num_docs
+        else:
+            return np.nan
+
+    def to_df(self):
+        """ Returns the dataframe of all the reports seen so far. """
+        return utilities.stats_to_df(self.frames, batched=True)
+
+
+def _process_source(directory, spelling_dictionary, workers=None, cache=None):
+    # A path to a file is a corpus archive, anything else an extracted directory.
+    if isfile(directory):
+        return process_archive(directory, spelling_dictionary, workers=workers)
+    return process_directory(directory, spelling_dictionary, workers=workers, cache=cache)
+
+
+def overview_report(directory, spelling_dictionary, title, workers=None, cache=None):
+    """
+    Prints an overview of the OCR quality of a directory, or of a corpus archive,
+    and charts the distribution of the error rates. The cache is only used for 
+    directories.
+    """
+    corpus_statistics = _process_source(directory, spelling_dictionary, workers, cache)
 
     df = utilities.stats_to_df(corpus_statistics)
 
@@ -257,9 +631,29 @@ def overview_report(directory, spelling_dictionary, title):
 
     return corpus_statistics
 
-def overview_statistics(directory, spelling_dictionary, title):
+def overview_statistics(directory, spelling_dictionary, title, workers=None, cache=None):
     """
+    Returns the statistics of a directory, or of a corpus archive, as a dataframe.
+    The cache is only used for directories.
     """
-    corpus_statistics = process_directory(directory, spelling_dictionary)
+    corpus_statistics = _process_source(directory, spelling_dictionary, workers, cache)
+
+    return utilities.stats_to_df(corpus_statistics)
+
+
+def streaming_overview(directory, spelling_dictionary, batch_size=1000, workers=None, cache=None):
+    """
+    Prints the figures of `overview_report` after each batch of `batch_size` 
+    documents, holding only one batch of full reports in memory at a time.
+    Returns the dataframe of the statistics (without the errors) for the directory.
+    """
+    running = RunningStats()
+    print("Directory: {}\n".format(directory))
+
+    batches = process_directory_batches(directory, spelling_dictionary, batch_size, workers, chunksize=min(batch_size, 100), cache=cache)
+    for batch in batches:
+        running.update(batch)
+        print("Documents: {} Average verified rate: {} Average of error rates: {} Total token count: {}".format(
+            running.num_docs, running.average_verified_rate(), running.average_error_rate(), running.token_count()))
 
-    return utilities.stats_to_df(corpus_statistics)
\ No newline at end of file
+    return running.to_df()
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+"""
+The rules module keeps the correction rules of a cleaning cycle in a versioned file,
+instead of in notebook variables, and re-applies them only where they matter.
+
+A :class:`RuleStore` records every change to the rules (replacement pairs, such as
+those from :func:`GoH.normalize.auto_spell_check`, and repeating-character rules of
+:func:`GoH.clean.check_for_repeating_characters`) as a new version. :func:`apply_rules`
+writes the corrected documents of a source directory or archive to an output directory,
+and remembers the version it applied and the content of the source. When it is run
+again, it rewrites the documents that changed in the source, and uses the
+:class:`GoH.tokenindex.TokenIndex` of the source to rewrite only the documents that
+contain the errors whose rules were added, changed or removed.
+
+Examples:
+    >>> store = GoH.rules.RuleStore('rules.json')
+    >>> store.add_pairs(GoH.normalize.auto_spell_check(errors, spelling_dictionary, WORDS), note='spelling')
+    >>> GoH.rules.apply_rules(store, dirs['prev'], dirs['cycle'], workers=4)
+"""
+import json
+import os
+import time
+from GoH import clean
+from GoH.cache import content_hash
+from GoH.corrections import CorrectionPipeline
+from GoH.tokenindex import _read_documents, load_token_index
+
+
+class RuleStore(object):
+    """Versioned set of correction rules, saved as JSON.
+
+    The file holds the list of changes; the rules of a version are those of all the
+    changes up to it. Every change is saved as soon as it is made.
+
+    Args:
+        path (str): Location of the rule file. It is created on the first change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            with open(path) as f:
+                self.changes = json.load(f)['changes']
+        else:
+            self.changes = []
+
+    @property
+    def version(self):
+        """Number of the latest version (0 if there are no rules)."""
+        return len(self.changes)
+
+    def rules(self, version=None):
+        """Return the rules of a version.
+
+        Args:
+            version (int): Version number. Defaults to the latest version.
+
+        Returns:
+            dict: `pairs`, a dictionary of errors and replacements, and `repeating`, a
+            sorted list of the characters of the repeating-character rules.
+        """
+        if version is None:
+            version = self.version
+        pairs = {}
+        repeating = set()
+        for change in self.changes[:version]:
+            pairs.update(change['pairs'])
+            for error in change['removed_pairs']:
+                pairs.pop(error, None)
+            repeating.update(change['repeating'])
+            repeating.difference_update(change['removed_repeating'])
+        return {'pairs': pairs, 'repeating': sorted(repeating)}
+
+    def _commit(self, note, pairs=None, removed_pairs=(), repeating=(), removed_repeating=()):
+        current = self.rules()
+        pairs = {error: replacement for error, replacement in (pairs or {}).items()
+                 if current['pairs'].get(error) != replacement}
+        removed_pairs = sorted(error for error in removed_pairs if error in current['pairs'])
+        repeating = sorted(set(repeating) - set(current['repeating']))
+        removed_repeating = sorted(set(removed_repeating) & set(current['repeating']))
+        if not (pairs or removed_pairs or repeating or removed_repeating):
+            return self.version
+
+        self.changes.append({'version': self.version + 1,
+                             'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                             'note': note,
+                             'pairs': pairs,
+                             'removed_pairs': removed_pairs,
+                             'repeating': repeating,
+                             'removed_repeating': removed_repeating})
+        self.save()
+        return self.version
+
+    def add_pairs(self, pairs, note=''):
+        """Add or change replacement pairs.
+
+        Args:
+            pairs: (error, replacement) tuples or a dictionary. Pairs that are already in
+                the rules are ignored.
+            note (str): Description of the change.
+
+        Returns:
+            int: The new version (the current version if nothing changed).
+        """
+        return self._commit(note, pairs=dict(pairs))
+
+    def remove_pairs(self, errors, note=''):
+        """Remove the replacement pairs of some errors. Returns the new version."""
+        return self._commit(note, removed_pairs=errors)
+
+    def add_repeating(self, characters, note=''):
+        """Add repeating-character rules for some characters. Returns the new version."""
+        return self._commit(note, repeating=characters)
+
+    def remove_repeating(self, characters, note=''):
+        """Remove the repeating-character rules of some characters. Returns the new version."""
+        return self._commit(note, removed_repeating=characters)
+
+    def changed_since(self, version):
+        """Return what changed after a version.
+
+        Returns:
+            tuple: The set of errors whose pair was added, changed or removed, and whether
+            any repeating-character rule changed.
+        """
+        errors = set()
+        repeating = False
+        for change in self.changes[version:]:
+            errors.update(change['pairs'])
+            errors.update(change['removed_pairs'])
+            repeating = repeating or bool(change['repeating'] or change['removed_repeating'])
+        return errors, repeating
+
+    def pipeline(self, version=None):
+        """Return a :class:`GoH.corrections.CorrectionPipeline` applying the rules of a version.
+        The replacement pairs are applied first, with a :class:`GoH.clean.MultiReplacer`.
+        """
+        rules = self.rules(version)
+        steps = [clean.MultiReplacer(rules['pairs']).rule('pairs')]
+        for character in rules['repeating']:
+            steps.append(('repeating_{}'.format(character), RepeatingCharacters(character), ' '))
+        return CorrectionPipeline(steps)
+
+    def save(self):
+        """Write the rules to disk, replacing the previous file only once it is complete."""
+        tmp_path = '{}.tmp'.format(self.path)
+        with open(tmp_path, 'w') as f:
+            json.dump({'changes': self.changes}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+class RepeatingCharacters(object):
+    """Pipeline pattern replacing the tokens found by :func:`GoH.clean.check_for_repeating_characters`.
+
+    The tokens are replaced as whole words, rather than as regular expressions.
+    """
+
+    def __init__(self, character):
+        self.character = character
+
+    def subn(self, repl, content):
+        replacements = clean.noise_replacements(content.split(), [self.character])
+        if not replacements:
+            return content, 0
+        return clean.MultiReplacer((token, repl) for token, _ in replacements).subn(content)
+
+
+def _state_path( output_dir ):
+    return os.path.join(output_dir, '.rules_state.json')
+
+
+def _source_index_path( output_dir ):
+    # The token index of the source is kept with the output, so the source is not modified.
+    return os.path.join(output_dir, '.rules_source_index.npz')
+
+
+def _document_hashes( source ):
+    # Content hash of each document of the source, in corpus order.
+    return {doc_id: content_hash(content) for doc_id, content in _read_documents(source)}
+
+
+def apply_rules( store, source, output_dir, workers=None, full=False ):
+    """Write the documents of `source` corrected with the latest rules to `output_dir`.
+
+    The first run (or a run with `full`, or from another source) corrects every
+    document. Later runs only rewrite the documents whose content changed in the
+    source, those missing from `output_dir`, and those that contain an error whose pair
+    changed since the version recorded in `output_dir`. If a repeating-character rule
+    changed, every document is rewritten. The output of documents removed from the
+    source is deleted.
+
+    The state of the last run (the rules, their version, the source and the content
+    hash of each of its documents) is saved in `output_dir`, with the token index of
+    the source.
+
+    Args:
+        store (RuleStore): The correction rules.
+        source (str): Directory of the previous cycle, or path to a corpus archive. It
+            is not modified.
+        output_dir (str): Directory of the current cycle.
+        workers (int): Number of worker processes.
+        full (bool): Rewrite every document.
+
+    Returns:
+        dict: The summary of :meth:`GoH.corrections.CorrectionPipeline.run`, with the
+        `version` applied and the `rewritten` doc_ids (None if all were rewritten).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    state = {}
+    if os.path.exists(_state_path(output_dir)):
+        with open(_state_path(output_dir)) as f:
+            state = json.load(f)
+
+    hashes = _document_hashes(source)
+    previous = state.get('hashes', {})
+    for doc_id in previous:
+        if doc_id not in hashes and os.path.exists(os.path.join(output_dir, doc_id)):
+            os.remove(os.path.join(output_dir, doc_id))
+
+    documents = None
+    if (not full and state.get('store') == os.path.abspath(store.path)
+            and state.get('source') == os.path.abspath(source)):
+        errors, repeating = store.changed_since(state['version'])
+        if not repeating:
+            existing = set(os.listdir(output_dir))
+            affected = {doc_id for doc_id, content in hashes.items()
+                        if doc_id not in existing or previous.get(doc_id) != content}
+            if errors:
+                index = load_token_index(source, workers=workers, path=_source_index_path(output_dir))
+                for error in errors:
+                    affected.update(index.documents(error))
+            documents = [doc_id for doc_id in hashes if doc_id in affected]
+
+    summary = store.pipeline().run(source, output_dir, workers=workers, documents=documents)
+
+    tmp_path = '{}.tmp'.format(_state_path(output_dir))
+    with open(tmp_path, 'w') as f:
+        json.dump({'store': os.path.abspath(store.path),
+                   'version': store.version,
+                   'source': os.path.abspath(source),
+                   'hashes': hashes}, f)
+    os.replace(tmp_path, _state_path(output_dir))
+
+    summary.update({'version': store.version, 'rewritten': documents})
+    return summary
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+The spelling module compiles spelling dictionaries into a single binary file, so that the
+wordlists are read, lowercased and deduplicated once, and the fingerprint of the words
+and their index by length are computed once, rather than on every run.
+
+The compiled file holds the sorted, deduplicated words as one UTF-8 string table, followed
+by an index of the words ordered by length. Loading it returns a :class:`SpellingDictionary`,
+a `frozenset` of the words, so it can be used everywhere a spelling dictionary set is
+expected, with the same membership speed. It also answers the length and prefix queries
+of the spell-correction code, and gives the fingerprint used by :mod:`GoH.cache` without
+hashing the words again.
+
+Note:
+    Loading builds the set from the whole string table, so it takes about as long as
+    :func:`GoH.utilities.create_spelling_dictionary` on the same words, and every process
+    (including each worker, which reloads the file) holds its own copy of the words.
+
+Examples:
+    >>> GoH.spelling.compile_spelling_dictionary(directory, wordlists, 'spelling.dict')
+    >>> spelling_dictionary = GoH.spelling.load_spelling_dictionary('spelling.dict')
+    >>> spelling_dictionary.words_by_length(5, 7)
+"""
+from bisect import bisect_left
+import json
+import mmap
+import numpy as np
+import struct
+from GoH import utilities
+from GoH.cache import dictionary_fingerprint
+
+MAGIC = b'GOHDICT1'
+
+
+def write_spelling_dictionary( words, path ):
+    """Write a collection of words as a compiled spelling dictionary.
+
+    Args:
+        words (iterable): The verified words. Duplicates are removed.
+        path (str): Location of the compiled file.
+    """
+    words = sorted(set(words))
+    lengths = np.array([len(word) for word in words], dtype=np.uint32)
+    by_length = np.argsort(lengths, kind='mergesort').astype('<u4')
+    max_length = int(lengths.max()) if len(words) else 0
+    length_starts = np.searchsorted(lengths[by_length], np.arange(max_length + 2)).astype('<u4')
+
+    blob = '\n'.join(words).encode('utf8')
+    header = json.dumps({'count': len(words),
+                         'fingerprint': dictionary_fingerprint(words),
+                         'blob_size': len(blob),
+                         'max_length': max_length}).encode('utf8')
+    padding = -(len(MAGIC) + 4 + len(header) + len(blob)) % 4
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(blob)
+        f.write(b'\0' * padding)
+        f.write(by_length.tobytes())
+        f.write(length_starts.tobytes())
+
+
+def compile_spelling_dictionary( directory, wordlists, path ):
+    """Compile wordlist files into a spelling dictionary file.
+
+    References:
+        :func:`GoH.utilities.create_spelling_dictionary`
+
+    Args:
+        directory (str): Location of the wordlist files.
+        wordlists (list): List of filenames for the wordlist files.
+        path (str): Location of the compiled file.
+
+    Returns:
+        SpellingDictionary: The compiled dictionary, loaded from `path`.
+    """
+    write_spelling_dictionary(utilities.create_spelling_dictionary(directory, wordlists), path)
+
+    return load_spelling_dictionary(path)
+
+
+def load_spelling_dictionary( path ):
+    """Load a compiled spelling dictionary.
+
+    Args:
+        path (str): Location of the file written by :func:`compile_spelling_dictionary`.
+
+    Returns:
+        SpellingDictionary: Set of the words in the dictionary.
+    """
+    return SpellingDictionary(path)
+
+
+class SpellingDictionary(frozenset):
+    """Set of verified words loaded from a compiled spelling dictionary file.
+
+    Attributes:
+        path (str): Location of the compiled file.
+        fingerprint (str): Fingerprint of the words, as :func:`GoH.cache.dictionary_fingerprint`.
+        words (list): The words, sorted.
+    """
+
+    def __new__(cls, path):
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError('{} is not a compiled spelling dictionary'.format(path))
+        header_size, = struct.unpack_from('<I', buffer, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(buffer[start:start + header_size].decode('utf8'))
+        start += header_size
+
+        count = header['count']
+        words = buffer[start:start + header['blob_size']].decode('utf8').split('\n') if count else []
+        start += header['blob_size']
+        start += -start % 4
+
+        self = super(SpellingDictionary, cls).__new__(cls, words)
+        self.path = path
+        self.fingerprint = header['fingerprint']
+        self.words = words
+        self._by_length = np.frombuffer(buffer, dtype='<u4', count=count, offset=start)
+        self._length_starts = np.frombuffer(buffer, dtype='<u4', count=header['max_length'] + 2,
+                                            offset=start + 4 * count)
+        return self
+
+    def __reduce__(self):
+        # Worker processes load the file again, which keeps the class and its fingerprint.
+        return (load_spelling_dictionary, (self.path,))
+
+    def words_by_length( self, min_length, max_length=None ):
+        """Return the words with a length between `min_length` and `max_length` (inclusive).
+
+        Args:
+            min_length (int): Shortest length.
+            max_length (int): Longest length. Defaults to `min_length`.
+
+        Returns:
+            list: The words, shortest first, in alphabetical order within each length.
+        """
+        if max_length is None:
+            max_length = min_length
+        last = len(self._length_starts) - 1
+        start = self._length_starts[min(max(min_length, 0), last)]
+        end = self._length_starts[min(max(max_length + 1, 0), last)]
+        return [self.words[i] for i in self._by_length[start:end]]
+
+    def with_prefix( self, prefix ):
+        """Return the words that start with `prefix`, in alphabetical order."""
+        start = bisect_left(self.words, prefix)
+        end = start
+        while end < len(self.words) and self.words[end].startswith(prefix):
+            end += 1
+        return self.words[start:end]
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+The tokencache module writes a tokenized corpus to disk once, so that building the
+gensim dictionary and every training pass read the tokens instead of decompressing the
+corpus archive and tokenizing (and lemmatizing) it again.
+
+The cache is a directory holding every token of the corpus as an int32 id, in one
+array (`tokens.bin`), the offset of each document in that array (`offsets.npy`), the
+vocabulary of the ids (`vocabulary.txt`) and the title and doc_id of each document
+(`documents.json`). The arrays are memory-mapped when the cache is read.
+
+Examples:
+    >>> GoH.tokencache.materialize(GoH.corpora.Lemma_Corpus(fname, workers=4), 'lemma-cache')
+    >>> cache = GoH.tokencache.TokenCache('lemma-cache')
+    >>> dictionary = gensim.corpora.Dictionary(tokens for title, doc_id, tokens in cache)
+    >>> dictionary.filter_extremes(no_below=5)
+    >>> model = gensim.models.LdaModel(cache.bow(dictionary), id2word=dictionary, passes=8)
+"""
+import json
+import logging
+import os
+import numpy as np
+
+
+def materialize(corpus, path, log_every=1000):
+    """Tokenize a corpus once and write the tokens to a cache directory.
+
+    Args:
+        corpus (iterable): Yields `(title, doc_id, tokens)`, like :class:`GoH.corpora.Lemma_Corpus`,
+            or `(title, tokens)`, like :class:`GoH.model.Tokenized_Corpus`.
+        path (str): The cache directory. Created if needed; an existing cache is replaced.
+        log_every (int): Logging frequency, in documents.
+
+    Returns:
+        TokenCache: The cache.
+    """
+    os.makedirs(path, exist_ok=True)
+    token_ids = {}
+    offsets = [0]
+    documents = []
+
+    with open(os.path.join(path, 'tokens.bin'), 'wb') as f:
+        for n, item in enumerate(corpus):
+            title, tokens = item[0], item[-1]
+            doc_id = item[1] if len(item) > 2 else n
+            ids = np.fromiter((token_ids.setdefault(token, len(token_ids)) for token in tokens),
+                              dtype='<i4', count=len(tokens))
+            f.write(ids.tobytes())
+            offsets.append(offsets[-1] + len(ids))
+            documents.append([title, doc_id])
+            if log_every and n % log_every == 0:
+                logging.info("cached document #%i: %s" % (n, title))
+
+    np.save(os.path.join(path, 'offsets.npy'), np.array(offsets, dtype=np.int64))
+    with open(os.path.join(path, 'vocabulary.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(token_ids))
+    with open(os.path.join(path, 'documents.json'), 'w') as f:
+        json.dump(documents, f)
+
+    return TokenCache(path)
+
+
+class TokenCache(object):
+    """A tokenized corpus read from a cache written by :func:`materialize`.
+
+    Iterating over the cache yields `(title, doc_id, tokens)` like the corpus it was
+    made from, so it can replace that corpus (for example to build the dictionary).
+    The cache can be iterated any number of times.
+
+    Args:
+        path (str): The cache directory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        size = int(self.offsets[-1])
+        if size:
+            self.tokens = np.memmap(os.path.join(path, 'tokens.bin'), dtype='<i4', mode='r', shape=(size,))
+        else:
+            self.tokens = np.zeros(0, dtype='<i4')
+        with open(os.path.join(path, 'vocabulary.txt'), encoding='utf-8') as f:
+            content = f.read()
+            self.vocabulary = content.split('\n') if content else []
+        with open(os.path.join(path, 'documents.json')) as f:
+            self.documents = [tuple(document) for document in json.load(f)]
+
+    def __len__(self):
+        return len(self.documents)
+
+    def token_ids(self, n):
+        """Return the cache ids of the tokens of the `n`-th document."""
+        return self.tokens[self.offsets[n]:self.offsets[n + 1]]
+
+    def __iter__(self):
+        vocabulary = self.vocabulary
+        for n, (title, doc_id) in enumerate(self.documents):
+            yield title, doc_id, [vocabulary[i] for i in self.token_ids(n)]
+
+    def bow(self, dictionary):
+        """Return a bag-of-words corpus of the cache, with the ids of a gensim dictionary."""
+        return BoWCache(self, dictionary)
+
+
+class BoWCache(object):
+    """Bag-of-words corpus read from a :class:`TokenCache`.
+
+    Yields the same vectors as `dictionary.doc2bow(tokens)` for each document (tokens
+    missing from the dictionary are dropped), computed from the memory-mapped token ids
+    without building the token strings. Like :class:`GoH.corpora.BoWCorpus`, it can be
+    passed to gensim models as the training corpus.
+
+    Args:
+        cache (TokenCache): The tokenized corpus.
+        dictionary (gensim.corpora.Dictionary): Dictionary giving the ids of the vectors.
+    """
+
+    def __init__(self, cache, dictionary):
+        self.cache = cache
+        self.dictionary = dictionary
+        self.id_map = np.array([dictionary.token2id.get(token, -1) for token in cache.vocabulary], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __iter__(self):
+        id_map = self.id_map
+        for n in range(len(self.cache)):
+            ids = id_map[self.cache.token_ids(n)]
+            ids, counts = np.unique(ids[ids >= 0], return_counts=True)
+            yield list(zip(ids.tolist(), counts.tolist()))
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+"""
+The tokenindex module records where each token occurs in a corpus: in which documents,
+and at which character offsets. The documents affected by a correction, the pages that
+contain an error and the concordance of an error are then found without reading the
+whole corpus, or loading it as a single NLTK `Text`.
+
+Tokens are the runs of word characters of the lowercased text (`\\w+`). A string that
+occurs in a document as a whole word (as matched by :class:`GoH.clean.MultiReplacer`)
+has all of its tokens in that document, so :meth:`TokenIndex.documents` never misses
+a document where the string occurs. Each occurrence is recorded with its position
+among the tokens of the document, and a phrase is found where its tokens are at
+consecutive positions, whatever the spaces, line breaks or punctuation between them.
+
+The index of a corpus directory is saved inside it as `.token_index.npz` (hidden files
+are not read as pages), and that of a corpus archive next to it as `<archive>.tokens.npz`.
+
+Examples:
+    >>> index = GoH.tokenindex.load_token_index(directory)
+    >>> index.documents("righteousness")
+    >>> index.concordance("tbe")
+    >>> GoH.utilities.open_original_docs(index.docs_containing("tbe")[:5])
+"""
+from array import array
+from collections import namedtuple
+import os
+import re
+import numpy as np
+from GoH import archive
+from GoH import reports
+from GoH import utilities
+from GoH.errormatrix import _join_strings, _split_strings
+
+_WORD = re.compile(r'\w+')
+
+
+ConcordanceLine = namedtuple('ConcordanceLine', ['doc_id', 'offset', 'left', 'query', 'right', 'line'])
+
+
+def tokenize(text):
+    """Return the distinct tokens of a text."""
+    return {token.lower() for token in _WORD.findall(text)}
+
+
+def token_positions(text):
+    """Return the positions of each token of a text, as a dictionary of two lists: the
+    ordinal of each occurrence among the tokens of the text, and its character offset.
+    """
+    positions = {}
+    for ordinal, match in enumerate(_WORD.finditer(text)):
+        ordinals, offsets = positions.setdefault(match.group().lower(), ([], []))
+        ordinals.append(ordinal)
+        offsets.append(match.start())
+    return positions
+
+
+def index_path( source ):
+    """Location of the token index of a corpus directory or archive."""
+    if os.path.isdir(source):
+        return os.path.join(source, '.token_index.npz')
+    return '{}.tokens.npz'.format(source)
+
+
+def _source_state( source ):
+    # Number, latest modification time and size of the documents, to tell when a saved
+    # index is out of date.
+    if os.path.isdir(source):
+        stats = [os.stat(os.path.join(source, doc_id)) for doc_id in reports.list_documents(source)]
+        return np.array([len(stats),
+                         max((stat.st_mtime for stat in stats), default=0),
+                         sum(stat.st_size for stat in stats)])
+    stat = os.stat(source)
+    return np.array([stat.st_mtime, stat.st_size])
+
+
+def _read_documents( source ):
+    if os.path.isdir(source):
+        return ((doc_id, utilities.readfile(source, doc_id)) for doc_id in reports.list_documents(source))
+    return archive.iter_pages(source)
+
+
+def _tokenize_document( document ):
+    doc_id, content = document
+    return doc_id, token_positions(content)
+
+
+class TokenIndex(object):
+    """Positional inverted index of the tokens of a corpus.
+
+    Args:
+        doc_ids (list): The documents, in corpus order.
+        vocabulary (list): The tokens, sorted.
+        indptr (array): Start of the postings of each token in `docs`, plus the end.
+        docs (array): Positions in `doc_ids` of the documents containing each token, sorted.
+        occurrence_indptr (array): Start of the occurrences of each token in
+            `occurrence_docs` and `offsets`, plus the end.
+        occurrence_docs (array): Document of each occurrence, sorted.
+        ordinals (array): Position of each occurrence among the tokens of its document.
+        offsets (array): Character offset of each occurrence in its document.
+        state (array): State of the source when the index was built.
+        source (str): Location of the corpus, used to read the context of a concordance.
+    """
+
+    def __init__(self, doc_ids, vocabulary, indptr, docs, occurrence_indptr, occurrence_docs, ordinals, offsets,
+                 state=None, source=None):
+        self.doc_ids = doc_ids
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.docs = docs
+        self.occurrence_indptr = occurrence_indptr
+        self.occurrence_docs = occurrence_docs
+        self.ordinals = ordinals
+        self.offsets = offsets
+        self.state = state
+        self.source = source
+        self._token_ids = {token: i for i, token in enumerate(vocabulary)}
+
+    @classmethod
+    def build(cls, source, workers=None, chunksize=100):
+        """Index the documents of a corpus directory or archive.
+
+        Args:
+            source (str): Path to a directory of page files, or to a corpus tar archive.
+            workers (int): Number of worker processes tokenizing the documents. None
+                (default) or 1 tokenizes them in the calling process.
+            chunksize (int): Number of documents sent to a worker at a time.
+
+        Returns:
+            TokenIndex: The index of the corpus.
+        """
+        state = _source_state(source)
+        documents = _read_documents(source)
+        if workers is None or workers == 1:
+            tokenized = map(_tokenize_document, documents)
+        else:
+            tokenized = utilities.parallel_imap(_tokenize_document, documents, workers=workers, chunksize=chunksize)
+
+        doc_ids = []
+        postings = {}
+        occurrences = {}
+        for doc, (doc_id, tokens) in enumerate(tokenized):
+            doc_ids.append(doc_id)
+            for token, (token_ordinals, token_offsets) in tokens.items():
+                postings.setdefault(token, array('i')).append(doc)
+                token_docs, ordinals, offsets = occurrences.setdefault(token, (array('i'), array('i'), array('i')))
+                token_docs.extend([doc] * len(token_offsets))
+                ordinals.extend(token_ordinals)
+                offsets.extend(token_offsets)
+
+        vocabulary = sorted(postings)
+        indptr, docs = _concatenate([postings.pop(token) for token in vocabulary])
+        occurrence_indptr, occurrence_docs = _concatenate([occurrences[token][0] for token in vocabulary])
+        ordinals = _concatenate([occurrences[token][1] for token in vocabulary])[1]
+        offsets = _concatenate([occurrences.pop(token)[2] for token in vocabulary])[1]
+
+        return cls(doc_ids, vocabulary, indptr, docs, occurrence_indptr, occurrence_docs, ordinals, offsets,
+                   state, source)
+
+    @classmethod
+    def load(cls, path, source=None):
+        """Load an index saved with :meth:`save`.
+
+        An index saved without the ordinals of the occurrences (by an earlier version)
+        is loaded without a `state`, so :func:`load_token_index` builds it again.
+        """
+        with np.load(path, allow_pickle=False) as f:
+            if 'ordinals' not in f.files:
+                return cls(_split_strings(f['doc_ids']), _split_strings(f['vocabulary']),
+                           f['indptr'], f['docs'], f['occurrence_indptr'], f['occurrence_docs'],
+                           None, f['offsets'], None, source)
+            return cls(_split_strings(f['doc_ids']), _split_strings(f['vocabulary']),
+                       f['indptr'], f['docs'], f['occurrence_indptr'], f['occurrence_docs'], f['ordinals'],
+                       f['offsets'], f['state'], source)
+
+    def save(self, path):
+        """Save the index to a single `.npz` file."""
+        np.savez_compressed(path,
+                            doc_ids=_join_strings(self.doc_ids),
+                            vocabulary=_join_strings(self.vocabulary),
+                            indptr=self.indptr,
+                            docs=self.docs,
+                            occurrence_indptr=self.occurrence_indptr,
+                            occurrence_docs=self.occurrence_docs,
+                            ordinals=self.ordinals,
+                            offsets=self.offsets,
+                            state=self.state if self.state is not None else np.zeros(2))
+
+    def _postings(self, token):
+        i = self._token_ids.get(token)
+        if i is None:
+            return self.docs[:0]
+        return self.docs[self.indptr[i]:self.indptr[i + 1]]
+
+    def documents(self, string):
+        """Return the documents that may contain a string.
+
+        Args:
+            string (str): A token, word or phrase. Case is ignored.
+
+        Returns:
+            list: doc_ids of the documents that contain every token of `string`, in corpus
+            order. All documents, if `string` has no tokens.
+        """
+        tokens = tokenize(string)
+        if not tokens:
+            return list(self.doc_ids)
+
+        postings = sorted((self._postings(token) for token in tokens), key=len)
+        docs = postings[0]
+        for other in postings[1:]:
+            docs = np.intersect1d(docs, other, assume_unique=True)
+        return [self.doc_ids[doc] for doc in docs]
+
+    def doc_freq(self, token):
+        """Number of documents that contain a token."""
+        return len(self._postings(token.lower()))
+
+    def occurrences(self, string):
+        """Find the occurrences of a token or phrase.
+
+        A phrase occurs where its tokens follow each other, in the order of `string`,
+        whatever separates them. Case is ignored.
+
+        Returns:
+            tuple: Arrays of the positions in `doc_ids` of the documents and of the character
+            offsets of the occurrences (of the first token of `string`), in corpus order.
+        """
+        docs, offsets, ends = self._phrase_occurrences(string)
+        return docs, offsets
+
+    def _phrase_occurrences(self, string):
+        # Documents, start offsets and end offsets of the occurrences of a phrase.
+        tokens = [match.group().lower() for match in _WORD.finditer(string)]
+        if not tokens:
+            empty = np.array([], dtype=np.int32)
+            return empty, empty, empty
+
+        docs, ordinals, offsets = self._occurrences(tokens[0])
+        ends = offsets + len(tokens[0])
+        for distance, token in enumerate(tokens[1:], 1):
+            other_docs, other_ordinals, other_offsets = self._occurrences(token)
+            # Keys of the occurrences are sorted, as the ordinals increase within each document.
+            other_keys = _keys(other_docs, other_ordinals - distance)
+            keys = _keys(docs, ordinals)
+            found = np.isin(keys, other_keys)
+            docs, ordinals, offsets = docs[found], ordinals[found], offsets[found]
+            ends = other_offsets[np.searchsorted(other_keys, keys[found])] + len(token)
+        return docs, offsets, ends
+
+    def _occurrences(self, token):
+        i = self._token_ids.get(token)
+        if i is None:
+            return self.occurrence_docs[:0], self.ordinals[:0], self.offsets[:0]
+        start, end = self.occurrence_indptr[i], self.occurrence_indptr[i + 1]
+        return self.occurrence_docs[start:end], self.ordinals[start:end], self.offsets[start:end]
+
+    def docs_containing(self, string):
+        """Return the doc_ids of the pages in which a token or phrase occurs, in corpus order."""
+        docs = np.unique(self.occurrences(string)[0])
+        return [self.doc_ids[doc] for doc in docs]
+
+    def concordance_list(self, string, width=80, lines=None):
+        """Return the concordance lines of a token or phrase, like those of
+        :meth:`nltk.text.Text.concordance_list`, reading only the pages in which it occurs.
+
+        The context of each occurrence is taken from its own page.
+
+        Args:
+            string (str): Token or phrase. Case is ignored.
+            width (int): Width of each line, in characters.
+            lines (int): Maximum number of lines. All occurrences if None.
+
+        Returns:
+            list: `ConcordanceLine` tuples of the doc_id, the character offset, the left
+            context words, the occurrence as written, the right context words and the
+            printed line.
+        """
+        docs, offsets, ends = self._phrase_occurrences(string)
+        if lines is not None:
+            docs, offsets, ends = docs[:lines], offsets[:lines], ends[:lines]
+
+        half_width = (width - len(string) - 2) // 2
+        context = width // 4
+        wanted = {}
+        for doc, offset, end in zip(docs, offsets, ends):
+            wanted.setdefault(self.doc_ids[doc], []).append((int(offset), int(end)))
+
+        concordance = []
+        for doc_id, content in self._read(list(wanted)):
+            for offset, end in wanted[doc_id]:
+                left = content[:offset].split()[-context:]
+                right = content[end:].split()[:context]
+                query = ' '.join(content[offset:end].split())
+                left_print = ' '.join(left)[-half_width:].rjust(half_width) if half_width > 0 else ''
+                right_print = ' '.join(right)[:half_width] if half_width > 0 else ''
+                concordance.append(ConcordanceLine(doc_id, offset, left, query, right,
+                                                   ' '.join([left_print, query, right_print])))
+        return concordance
+
+    def concordance(self, string, width=80, lines=25):
+        """Print the concordance of a token or phrase, like :meth:`nltk.text.Text.concordance`.
+        The index can be passed in place of the `Text` to :func:`GoH.normalize.run_spell_check_program`.
+        """
+        total = len(self.occurrences(string)[0])
+        if not total:
+            print("no matches")
+            return
+        concordance = self.concordance_list(string, width=width, lines=lines)
+        print("Displaying {} of {} matches:".format(len(concordance), total))
+        for line in concordance:
+            print(line.line)
+
+    def _read(self, doc_ids):
+        # Pages of the source, in corpus order.
+        if self.source is None:
+            raise ValueError('The location of the corpus is not known; load the index with load_token_index')
+        if os.path.isdir(self.source):
+            return ((doc_id, utilities.readfile(self.source, doc_id)) for doc_id in doc_ids)
+        return archive.iter_pages(self.source, doc_ids)
+
+
+def _concatenate( arrays ):
+    # Concatenate the postings of each token, returning the start of each and the values.
+    indptr = np.zeros(len(arrays) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(values) for values in arrays])
+    values = np.empty(indptr[-1], dtype=np.int32)
+    for i, token_values in enumerate(arrays):
+        values[indptr[i]:indptr[i + 1]] = np.frombuffer(token_values, dtype=np.int32)
+    return indptr, values
+
+
+def _keys( docs, offsets ):
+    return docs.astype(np.int64) << 32 | (offsets.astype(np.int64) & 0xffffffff)
+
+
+def load_token_index( source, rebuild=False, workers=None, path=None ):
+    """Load the token index of a corpus, building it if it is missing or out of date.
+
+    Args:
+        source (str): Path to a directory of page files, or to a corpus tar archive.
+        rebuild (bool): Build the index even if a current one exists.
+        workers (int): Number of worker processes used to build the index.
+        path (str): Location of the saved index. Defaults to :func:`index_path`, which
+            is inside a corpus directory.
+
+    Returns:
+        TokenIndex: The index of the corpus.
+    """
+    if path is None:
+        path = index_path(source)
+    if not rebuild and os.path.exists(path):
+        index = TokenIndex.load(path, source)
+        if np.array_equal(index.state, _source_state(source)):
+            return index
+
+    index = TokenIndex.build(source, workers=workers)
+    index.save(path)
+
+    return index
@@ -9,7 +9,11 @@ Examples:
     >>> spelling_dictionary = GoH.utilities.create_spelling_dictionary( wordlists, directory )
 
 """
+from collections import deque
+from GoH import archive
 import gspread
+import itertools
+import multiprocessing
 from nltk.tokenize import WhitespaceTokenizer
 from nltk import word_tokenize
 import os
@@ -18,6 +22,14 @@ import pandas as pd
 import re
 import tarfile
 
+_DIGITS = re.compile(r'[0-9]+')
+_LETTERS = re.compile(r'[A-Za-z]+')
+
+# Matches every line of a newline-joined list of page ids, so that `findall` returns one row per id.
+PAGE_ID_PATTERN = re.compile(r'^([A-Za-z]*)[^-0-9\n]*([0-9]{0,4})([0-9]{2})?([0-9]{2})?[^-\n]*'
+                             r'(?:-V([0-9]+))?(?:-([0-9]+))?(?:[^\n]*-page([0-9]+))?[^\n]*$', re.MULTILINE)
+PAGE_ID_COLUMNS = ['title', 'year', 'month', 'day', 'volume', 'issue', 'page']
+
 
 def readfile( input_dir, filename ):
 	"""Reads in file from directory and file name.
@@ -107,18 +119,19 @@ def create_spelling_dictionary( directory, wordlists ):
 
     Returns:
         set: List of unique words in all the compiled lists.
+
+    Note:
+        Use :func:`GoH.spelling.compile_spelling_dictionary` to save the result as a
+        compiled dictionary, with its fingerprint and length index.
     """
-    spelling_dictionary = []
+    spelling_dictionary = set()
     for wordlist in wordlists:
-        words = readfile(directory, wordlist).splitlines()
-        word_list = [w.lower() for w in words]
-        for each in word_list:
-            spelling_dictionary.append(each)
+        spelling_dictionary.update(readfile(directory, wordlist).lower().splitlines())
 
-    return set(spelling_dictionary)
+    return spelling_dictionary
 
 
-def stats_to_df( corpus_statistics ):
+def stats_to_df( corpus_statistics, batched=False ):
 	"""Convert stats to dictionary.
     Convert dictionary of corpus statistics to a dataframe for computations.
     
@@ -143,6 +156,10 @@ def stats_to_df( corpus_statistics ):
                 'errors': error_report
             }
 
+        batched (bool): If True, `corpus_statistics` is an iterable of batches, such as those yielded by
+            :func:`GoH.reports.process_directory_batches`, or of dataframes already converted. Each batch is
+            converted as it arrives, so only the compact dataframe of the whole corpus is kept in memory.
+
     Returns:
         dataframe: Returns a dataframe with the following columns::
 
@@ -152,7 +169,16 @@ def stats_to_df( corpus_statistics ):
             `num_errors`
 
 	"""
-	df = pd.DataFrame(corpus_statistics, columns=["doc_id", "error_rate", "num_tokens", "num_errors"])
+	columns = ["doc_id", "error_rate", "num_tokens", "num_errors"]
+
+	if batched:
+		frames = [batch[columns] if isinstance(batch, pd.DataFrame) else pd.DataFrame(batch, columns=columns)
+			for batch in corpus_statistics]
+		if not frames:
+			return pd.DataFrame(columns=columns)
+		return pd.concat(frames, ignore_index=True)
+
+	df = pd.DataFrame(corpus_statistics, columns=columns)
 
 	return df
 
@@ -167,7 +193,8 @@ def rate_per_doc( corpus_statistics ):
         Use :func:`GoH.reports.process_directory` before running `stats_to_df`
     
     Args:
-        corpus_statistics (dict): List of dictionaries with the information about all of the files in a directory.
+        corpus_statistics (dict): List of dictionaries with the information about all of the files in a directory,
+        or the dataframe of those statistics created with :func:`stats_to_df`.
         The corpus data should be formatted as follows::
 
             {
@@ -188,6 +215,9 @@ def rate_per_doc( corpus_statistics ):
                 'error_rate': .02
             }
     """
+    if isinstance(corpus_statistics, pd.DataFrame):
+        return dict(zip(corpus_statistics['doc_id'].tolist(), corpus_statistics['error_rate'].tolist()))
+
     docs_2_rates = {}
     for report in corpus_statistics:
         docs_2_rates.update({report['doc_id']: report['error_rate']})
@@ -214,7 +244,7 @@ def get_year( page_id ):
         str: Returns the first four digits, which corresponds to the year of publication.
     """
     split_id = page_id.split('-')
-    dates = re.search(r'[0-9]+', split_id[0])
+    dates = _DIGITS.search(split_id[0])
     
     return dates.group()[:4]
 
@@ -238,11 +268,90 @@ def get_title( page_id ):
         str: Returns the title information from the page id.
     """
     split_id = page_id.split('-')
-    title = re.match("[A-Za-z]+", split_id[0])
+    title = _LETTERS.match(split_id[0])
     
     return title.group()
 
 
+def parse_page_ids( page_ids ):
+    """Parse many page ids at once into a dataframe of their parts.
+    The ids are matched against a single compiled pattern in one pass.
+
+    Note:
+        File names must be structured as follows::
+
+            TITLEYYYYMMDD-V00-00-page0.txt
+
+        The `title` and `year` columns agree with :func:`get_title` and :func:`get_year`.
+        Parts that are missing from an id (such as the page of a PDF file name) are NaN,
+        in which case the column is float rather than int.
+
+    Args:
+        page_ids (list): Sequence or Series of filenames to parse.
+
+    Returns:
+        dataframe: Returns a dataframe with the following columns::
+
+            `doc_id` (str)
+            `title` (category)
+            `year`, `month`, `day`, `volume`, `issue`, `page` (int)
+    """
+    doc_ids = list(page_ids)
+    rows = PAGE_ID_PATTERN.findall('\n'.join(doc_ids)) if doc_ids else []
+    columns = list(zip(*rows)) or [()] * len(PAGE_ID_COLUMNS)
+
+    df = pd.DataFrame({'doc_id': pd.Series(doc_ids, dtype=object)}, columns=['doc_id'])
+    df['title'] = pd.Categorical([title or None for title in columns[0]])
+    for name, values in zip(PAGE_ID_COLUMNS[1:], columns[1:]):
+        if '' in values:
+            df[name] = [float(value) if value else float('nan') for value in values]
+        else:
+            df[name] = pd.Series(list(map(int, values)), dtype='int64')
+
+    return df
+
+
+def page_index( corpus, refresh=False ):
+    """Load the parsed page ids of a corpus, parsing only the ids that are not yet in the saved index.
+    The index is saved next to the corpus: as `.page_index.pkl` inside a corpus directory (hidden files
+    are not read as pages), or as `<archive>.pages.pkl` for a corpus archive.
+
+    References:
+        :func:`parse_page_ids`, :func:`GoH.archive.load_index`
+
+    Args:
+        corpus (str): Path to a directory of page files, or to a corpus tar archive.
+        refresh (bool): Parse all the ids again, ignoring the saved index.
+
+    Returns:
+        dataframe: The parsed page ids of the corpus, in the format of :func:`parse_page_ids`.
+    """
+    if os.path.isdir(corpus):
+        index_file = path.join(corpus, '.page_index.pkl')
+        page_ids = sorted(f for f in os.listdir(corpus)
+                          if not f.startswith('.') and path.isfile(path.join(corpus, f)))
+    else:
+        index_file = '{}.pages.pkl'.format(corpus)
+        page_ids = sorted(path.basename(name) for name, offset, size in archive.load_index(corpus)['members'])
+
+    saved = None
+    if not refresh and path.exists(index_file):
+        saved = pd.read_pickle(index_file)
+        known = set(saved['doc_id'])
+        new_ids = [page_id for page_id in page_ids if page_id not in known]
+        if not new_ids and len(known) == len(page_ids):
+            return saved
+        parsed = pd.concat([saved[saved['doc_id'].isin(page_ids)], parse_page_ids(new_ids)], ignore_index=True)
+        parsed['title'] = pd.Categorical(parsed['title'])
+        parsed = parsed.sort_values('doc_id').reset_index(drop=True)
+    else:
+        parsed = parse_page_ids(page_ids)
+
+    parsed.to_pickle(index_file)
+
+    return parsed
+
+
 def get_doc_errors( input_dir, filename, dictionary ):
     """Identify words in text that are not in a dictionary set.
     
@@ -293,7 +402,7 @@ def define_directories( prev, cycle, base_dir ):
     Returns:
         dict: Dictionary with keys `prev` and `cycle` and values of the corresponding directory paths.
     """
-    return {'prev': join(base_dir, prev), 'cycle': join(base_dir, cycle)}
+    return {'prev': path.join(base_dir, prev), 'cycle': path.join(base_dir, cycle)}
 
 
 def extract_words_from_dictionary(filepath):
@@ -337,3 +446,54 @@ def create_tar_files(corpusDir, samplePrefix, tarFullCorpusObject, selectList):
 
     SampleTar.close()
     HoldoutTar.close()
+
+
+def _map_chunk( func, chunk ):
+    return [func(item) for item in chunk]
+
+
+def parallel_imap( func, iterable, workers=None, chunksize=100, initializer=None, initargs=(), max_in_flight=None ):
+    """Apply a function to every item of an iterable in a pool of worker processes.
+    Results are yielded in the same order as the input, as soon as each chunk is done.
+
+    Unlike :meth:`multiprocessing.pool.Pool.imap`, the input is consumed lazily: at most
+    `max_in_flight` chunks are queued in the pool at any time, so long streams (such as
+    the pages of a corpus archive) are never read into memory ahead of the workers.
+
+    Usage::
+
+        >>> reports = parallel_imap(score_file, filenames, workers=4, chunksize=200)
+
+    Note:
+        `func` and the items must be picklable, so `func` should be a module-level function.
+        Use `initializer` and `initargs` to send large read-only objects (such as the spelling
+        dictionary) to each worker once, rather than with every item.
+
+    Args:
+        func (function): Function applied to each item.
+        iterable (iterable): Items to process.
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+        chunksize (int): Number of items sent to a worker at a time.
+        initializer (function): Called once in each worker when it starts.
+        initargs (tuple): Arguments for `initializer`.
+        max_in_flight (int): Maximum number of chunks queued in the pool. Defaults to
+            twice the number of workers.
+
+    Yields:
+        The result of `func` for each item, in input order.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    max_in_flight = max_in_flight or 2 * workers
+    items = iter(iterable)
+
+    with multiprocessing.Pool(workers, initializer, initargs) as pool:
+        pending = deque()
+        while True:
+            chunk = list(itertools.islice(items, chunksize))
+            if chunk:
+                pending.append(pool.apply_async(_map_chunk, (func, chunk)))
+            if pending and (not chunk or len(pending) >= max_in_flight):
+                for result in pending.popleft().get():
+                    yield result
+            elif not chunk:
+                break
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""Micro-benchmark of the per-page scorers in :mod:`GoH.reports`.
+
+Times :func:`GoH.reports.generate_doc_report` against :func:`GoH.reports.fast_doc_report`
+on synthetic pages (see `synthetic.py`), checks that both return the same reports, and
+prints the pages per second of each.
+
+Usage::
+
+    python benchmarks/doc_report.py --pages 2000 --words 400
+"""
+
+import argparse
+import time
+from GoH import reports
+from synthetic import generate_pages
+
+
+def time_scorer(scorer, pages, dictionary, repeat=3):
+    """Return the best pages per second of `scorer` over `repeat` runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            scorer(page, dictionary)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(pages) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=400)
+    parser.add_argument('--error-rate', type=float, default=.05)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages, dictionary = generate_pages(args.pages, args.words, args.error_rate)
+    pages = list(pages.values())
+
+    for page in pages:
+        if reports.fast_doc_report(page, dictionary) != reports.generate_doc_report(page, dictionary):
+            raise AssertionError("Reports differ for page: {}".format(page[:80]))
+
+    reference = time_scorer(reports.generate_doc_report, pages, dictionary, args.repeat)
+    fused = time_scorer(reports.fast_doc_report, pages, dictionary, args.repeat)
+
+    print("generate_doc_report: {:.0f} pages/s".format(reference))
+    print("fast_doc_report: {:.0f} pages/s".format(fused))
+    print("speedup: {:.1f}x".format(fused / reference))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""Agreement and speed of the phrase joiners in :mod:`GoH.corpora`.
+
+Runs :func:`GoH.corpora.connect_phrases` (TextBlob noun phrases) and
+:class:`GoH.corpora.PhraseJoiner` over the first pages of a corpus archive, and prints
+the report of :func:`GoH.corpora.phrase_agreement` and the pages per second of each.
+
+Usage::
+
+    python benchmarks/phrases.py 2017-05-corpus.tar.gz --pages 2000
+"""
+
+import argparse
+import itertools
+import json
+import time
+from GoH import corpora
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help='corpus tar archive, as read by GoH.corpora.iter_Periodicals')
+    parser.add_argument('--pages', type=int, default=2000)
+    args = parser.parse_args()
+
+    pages = [content for title, doc_id, content in
+             itertools.islice(corpora.iter_Periodicals(args.corpus, log_every=None), args.pages)]
+    joiner = corpora.PhraseJoiner()
+
+    start = time.perf_counter()
+    for page in pages:
+        corpora.connect_phrases(page)
+    textblob_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for page in pages:
+        joiner.join(page)
+    joiner_time = time.perf_counter() - start
+
+    report = corpora.phrase_agreement(pages, joiner)
+    report['textblob_pages_per_second'] = round(len(pages) / textblob_time, 1)
+    report['joiner_pages_per_second'] = round(len(pages) / joiner_time, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark suite for the OCR-report pipeline.
+
+Times :func:`GoH.reports.generate_doc_report`, :func:`GoH.reports.process_directory`,
+:func:`GoH.reports.get_errors_summary` and :func:`GoH.utilities.create_spelling_dictionary`
+on synthetic corpora of several sizes (see `synthetic.py`), and reports the throughput and
+the peak memory of each as JSON, so that runs can be compared.
+
+Peak memory is the peak of the Python allocations traced by :mod:`tracemalloc` during the
+benchmark, in bytes. Work done in worker processes is not included.
+
+Usage::
+
+    python benchmarks/run.py --sizes 100 1000 10000 --output before.json
+    python benchmarks/run.py --sizes 100 1000 10000 --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from GoH import reports, utilities
+from synthetic import generate_pages, write_corpus, write_wordlists
+
+
+def measure(func, *args, **kwargs):
+    """Run `func` once, returning its result, the elapsed seconds and the peak traced memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def score_pages(pages, spelling_dictionary):
+    for content in pages.values():
+        reports.generate_doc_report(content, spelling_dictionary)
+
+
+def run_size(num_pages, tokens_per_page, error_rate, workers):
+    """Run every benchmark on a corpus of `num_pages` pages and return the results."""
+    pages, spelling_dictionary = generate_pages(num_pages, tokens_per_page, error_rate)
+    directory = tempfile.mkdtemp()
+    corpus_dir = os.path.join(directory, 'corpus')
+    write_corpus(corpus_dir, pages)
+    wordlists = write_wordlists(directory, spelling_dictionary)
+    num_tokens = sum(len(content.split()) for content in pages.values())
+
+    benchmarks = [
+        ('generate_doc_report', score_pages, (pages, spelling_dictionary), {}, num_pages),
+        ('process_directory', reports.process_directory, (corpus_dir, spelling_dictionary), {}, num_pages),
+    ]
+    if workers:
+        benchmarks.append(('process_directory[workers={}]'.format(workers), reports.process_directory,
+                           (corpus_dir, spelling_dictionary), {'workers': workers}, num_pages))
+
+    results = []
+    statistics = None
+    for name, func, args, kwargs, items in benchmarks:
+        result, elapsed, peak = measure(func, *args, **kwargs)
+        if name == 'process_directory':
+            statistics = result
+        results.append(record(name, num_pages, num_tokens, items, elapsed, peak))
+
+    summary, elapsed, peak = measure(reports.get_errors_summary, statistics)
+    results.append(record('get_errors_summary', num_pages, num_tokens, num_pages, elapsed, peak))
+
+    words, elapsed, peak = measure(utilities.create_spelling_dictionary, directory, wordlists)
+    results.append(record('create_spelling_dictionary', num_pages, num_tokens, len(words), elapsed, peak))
+
+    shutil.rmtree(directory)
+    return results
+
+
+def record(name, num_pages, num_tokens, items, elapsed, peak):
+    return {'benchmark': name,
+            'pages': num_pages,
+            'tokens': num_tokens,
+            'seconds': round(elapsed, 6),
+            'items_per_second': round(items / elapsed, 1) if elapsed > 0 else None,
+            'peak_bytes': peak}
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'cpus': os.cpu_count(), 'commit': commit}
+
+
+def compare(results, baseline):
+    """Print the change in time and peak memory of each benchmark against a previous run."""
+    previous = {(r['benchmark'], r['pages']): r for r in baseline['results']}
+    print('{:<40} {:>8} {:>10} {:>10}'.format('benchmark', 'pages', 'time', 'memory'))
+    for r in results:
+        old = previous.get((r['benchmark'], r['pages']))
+        if old is None:
+            continue
+        print('{:<40} {:>8} {:>9.2f}x {:>9.2f}x'.format(
+            r['benchmark'], r['pages'],
+            r['seconds'] / old['seconds'] if old['seconds'] else float('nan'),
+            r['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else float('nan')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000],
+                        help='number of pages of each corpus')
+    parser.add_argument('--tokens', type=int, default=400, help='average tokens per page')
+    parser.add_argument('--error-rate', type=float, default=.05, help='share of tokens that are errors')
+    parser.add_argument('--workers', type=int, default=0, help='also time process_directory with workers')
+    parser.add_argument('--output', help='file to write the JSON results to (default: stdout)')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, args.tokens, args.error_rate, args.workers))
+
+    output = {'environment': environment(),
+              'parameters': {'tokens': args.tokens, 'error_rate': args.error_rate},
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
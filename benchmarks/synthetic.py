@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+"""Synthetic corpus generator for the benchmarks.
+
+Generates pages named like the periodical pages of the corpus
+(`TITLEYYYYMMDD-V00-00-pageN.txt`), made of words drawn with Zipf frequencies from a
+generated vocabulary, with a configurable share of OCR-like errors: substituted,
+dropped and inserted characters, words run together, special characters and numbers.
+
+Usage::
+
+    >>> pages, spelling_dictionary = generate_pages(1000, tokens_per_page=400, error_rate=.05)
+    >>> write_corpus(directory, pages)
+    >>> wordlists = write_wordlists(directory, spelling_dictionary)
+"""
+
+import os
+import random
+import string
+
+TITLES = ['RH', 'ST', 'GH', 'HR', 'YI', 'ADV']
+
+
+def generate_vocabulary(size, rng):
+    """Return `size` distinct lowercase pseudo-words of 1 to 12 letters."""
+    vocabulary = set()
+    while len(vocabulary) < size:
+        length = min(max(int(rng.gauss(6, 2.5)), 1), 12)
+        vocabulary.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    return sorted(vocabulary)
+
+
+def make_error(word, next_word, rng):
+    """Return an OCR-like corruption of `word`."""
+    kind = rng.random()
+    position = rng.randrange(len(word))
+    if kind < .35:
+        return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+    elif kind < .5:
+        return word[:position] + word[position + 1:] or word + word
+    elif kind < .65:
+        return word[:position] + rng.choice(string.ascii_lowercase) + word[position:]
+    elif kind < .8:
+        return word + next_word
+    elif kind < .95:
+        return word[:position] + rng.choice('*^~|\\/<>{}[]@#%') + word[position:]
+    return word + rng.choice(['ii', 'll', 'mm', 'nn']) * rng.randint(2, 4)
+
+
+def page_ids(num_pages, rng, titles=TITLES, pages_per_issue=8):
+    """Return `num_pages` page ids in the `TITLEYYYYMMDD-V00-00-pageN.txt` format."""
+    ids = []
+    issue = 0
+    while len(ids) < num_pages:
+        title = titles[issue % len(titles)]
+        year = 1849 + issue // 48
+        month = 1 + (issue // 4) % 12
+        day = 1 + 7 * (issue % 4)
+        for page in range(1, pages_per_issue + 1):
+            ids.append('{}{}{:02d}{:02d}-V{:02d}-{:02d}-page{}.txt'.format(
+                title, year, month, day, year - 1848, 1 + (issue // 4) % 52, page))
+        issue += 1
+    return ids[:num_pages]
+
+
+def generate_pages(num_pages, tokens_per_page=400, error_rate=.05, vocabulary_size=20000, seed=12):
+    """Generate the content of a synthetic corpus.
+
+    Args:
+        num_pages (int): Number of pages.
+        tokens_per_page (int): Average number of tokens on a page.
+        error_rate (float): Share of the tokens that are OCR errors.
+        vocabulary_size (int): Number of distinct words.
+        seed (int): Seed of the random generator, for reproducible corpora.
+
+    Returns:
+        tuple: A dictionary of page id to page content, and the spelling dictionary (set)
+        of the generated vocabulary.
+    """
+    rng = random.Random(seed)
+    vocabulary = generate_vocabulary(vocabulary_size, rng)
+    weights = [1.0 / rank for rank in range(1, len(vocabulary) + 1)]
+
+    pages = {}
+    for page_id in page_ids(num_pages, rng):
+        num_tokens = max(int(rng.gauss(tokens_per_page, tokens_per_page / 4)), 0)
+        words = rng.choices(vocabulary, weights, k=num_tokens + 1)
+        tokens = []
+        for i in range(num_tokens):
+            word = words[i]
+            if rng.random() < error_rate:
+                word = make_error(word, words[i + 1], rng)
+            if rng.random() < .08:
+                word = word.title()
+            if rng.random() < .1:
+                word += rng.choice(',.;:!?"')
+            elif rng.random() < .01:
+                word = str(rng.randint(1, 1900))
+            tokens.append(word)
+            if rng.random() < .08:
+                tokens.append('\n')
+        pages[page_id] = ' '.join(tokens)
+
+    return pages, set(vocabulary)
+
+
+def write_corpus(directory, pages):
+    """Write generated pages to files in `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    for page_id, content in pages.items():
+        with open(os.path.join(directory, page_id), 'w') as f:
+            f.write(content)
+
+
+def write_wordlists(directory, spelling_dictionary, num_files=3):
+    """Split a spelling dictionary over `num_files` wordlist files (with some duplicates and
+    capitalized entries, as in real wordlists). Returns the filenames."""
+    words = sorted(spelling_dictionary)
+    filenames = []
+    for n in range(num_files):
+        filename = 'wordlist{}.txt'.format(n)
+        part = words[n::num_files] + words[n:n + len(words) // 10]
+        with open(os.path.join(directory, filename), 'w') as f:
+            f.write('\n'.join(word.title() if i % 7 == 0 else word for i, word in enumerate(part)))
+        filenames.append(filename)
+    return filenames
@@ -0,0 +1,81 @@
+import random
+import unittest
+import GoH.clean as clean
+
+
+class SplitWordsCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dictionary = {"righteousness", "therefore", "together", "sabbath"}
+        self.tokens = "the right eousness of god there fore we gather to gether on the sab bath .".split()
+
+    def test_check_if_stem(self):
+        self.assertEqual(clean.check_if_stem(["eousness", "fore", "gether", "bath"], self.dictionary, self.tokens),
+            [("right", "eousness"), ("there", "fore"), ("to", "gether"), ("sab", "bath")])
+        self.assertEqual(clean.check_if_stem(["right", "sab"], self.dictionary, self.tokens, get_prior=False),
+            [("right", "eousness"), ("sab", "bath")])
+
+    def test_pairs_match_sequential_replacement(self):
+        rng = random.Random(3)
+        for _ in range(2000):
+            tokens = [''.join(rng.choice('ab.') for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(1, 12))]
+            content = ''.join(token + rng.choice([' ', '  ', '\n']) for token in tokens)
+            pairs = [(rng.choice(tokens), rng.choice(tokens)) for _ in range(rng.randint(1, 4))]
+            expected = content
+            for pair in pairs:
+                expected = clean.replace_split_words(pair, expected)
+            self.assertEqual(clean.replace_split_word_pairs(pairs, content), expected, (content, pairs))
+
+def replace_longest(pairs, content):
+    # Reference: at each position, replace the longest whole-word string.
+    replacements = dict(reversed(pairs))
+    is_word = lambda i: 0 <= i < len(content) and (content[i].isalnum() or content[i] == '_')
+    out = []
+    i = 0
+    while i < len(content):
+        for string in sorted(replacements, key=len, reverse=True):
+            end = i + len(string)
+            if (content.startswith(string, i)
+                    and not (is_word(i) and is_word(i - 1))
+                    and not (is_word(end - 1) and is_word(end))):
+                out.append(replacements[string])
+                i = end
+                break
+        else:
+            out.append(content[i])
+            i += 1
+    return ''.join(out)
+
+
+class MultiReplacerCase(unittest.TestCase):
+
+    def test_longest_whole_word_match(self):
+        replacer = clean.MultiReplacer([('teh', 'the'), ('tehm', 'them'), ('a.b', 'ab'), ('$5', 'five')])
+        self.assertEqual(replacer('teh tehm tehmx a.b a.bc $5 a$5'), 'the them tehmx ab a.bc five afive')
+
+    def test_matches_reference(self):
+        rng = random.Random(4)
+        for _ in range(500):
+            pairs = [(''.join(rng.choice('ab. ') for _ in range(rng.randint(1, 4))), str(n)) for n in range(rng.randint(1, 6))]
+            content = ''.join(rng.choice('ab. ') for _ in range(30))
+            self.assertEqual(clean.MultiReplacer(pairs)(content), replace_longest(pairs, content), (pairs, content))
+
+class NoiseCase(unittest.TestCase):
+
+    def test_same_tokens_as_repeating_characters(self):
+        rng = random.Random(2)
+        characters = ['l', 'mn', '.', '^', ']', 'a-z']
+        tokens = [''.join(rng.choice('lmnia.^]z-{},2x') for _ in range(rng.randint(0, 20))) for _ in range(3000)]
+        expected = set()
+        for character in characters:
+            expected.update(clean.check_for_repeating_characters(tokens, character))
+        self.assertEqual(set(clean.noise_replacements(tokens, characters)), expected)
+
+    def test_features(self):
+        features = clean.noise_features(['Tbeeee', 'aaa', 'Tbeeee'], ['e'])
+        self.assertEqual(features.loc['Tbeeee', ['length', 'max_run', 'repeating_e']].tolist(), [6, 4, 1])
+        self.assertEqual(features.loc['Tbeeee', 'vowel_ratio'], 4 / 6)
+        self.assertEqual(len(features), 2)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,5 +1,10 @@
+import os
+import shutil
+import tarfile
+import tempfile
 import unittest
 import GoH.corpora as corpora
+import GoH.model as model
 from GoH.preprocess import ENTITIES
 from nltk import word_tokenize
 
@@ -34,5 +39,90 @@ class PagePreprocessingCase(unittest.TestCase):
              "Error in the filtering step"
             )
 
+class PhraseJoinerCase(unittest.TestCase):
+
+    def setUp(self):
+        self.page = "A human system is full of moral obligations, but the true faith in God shineth down on the poor man."
+        self.joiner = corpora.PhraseJoiner(ENTITIES)
+
+    def test_join(self):
+        self.assertEqual(self.joiner.join(corpora.process_page(self.page)),
+            "a human_system is full of moral obligations  but the true_faith in god shineth down on the poor_man ",
+            "Phrases are not properly connected"
+            )
+
+    def test_longest_phrase(self):
+        joiner = corpora.PhraseJoiner("spirit of; spirit of prophecy; of prophecy")
+        self.assertEqual(joiner.join("The Spirit of Prophecy and the spirit of\nprophecy"),
+            "the spirit_of_prophecy and the spirit_of\nprophecy")
+        self.assertEqual(corpora.connect_phrases("Spirit of  prophecy", joiner=joiner), "spirit_of  prophecy")
+
+class Plural(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def lemmatize(self, token):
+        self.calls += 1
+        return token[:-1] if token.endswith('s') else token
+
+
+class LemmaCacheCase(unittest.TestCase):
+
+    def test_cache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'lemmas.pkl')
+        lemmatizer = Plural()
+        cache = corpora.LemmaCache(maxsize=3, path=path, lemmatizer=lemmatizer)
+        tokens = "obligations of moral obligations and faiths".split()
+        self.assertEqual(corpora.lemmatize_tokens(tokens, cache), "obligation of moral obligation and faith".split())
+        self.assertEqual(lemmatizer.calls, 5)
+        self.assertEqual(len(cache.lemmas), 3)
+        self.assertEqual(cache.lemmatize_tokens(["faiths", "faiths"]), ["faith", "faith"])
+        self.assertEqual(cache.stats()['hits'], 1)
+        cache.save()
+        self.assertIn("faiths", corpora.LemmaCache(path=path).lemmas)
+
+
+class ParallelCorpusCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fname = os.path.join(self.directory, 'corpus.tar.gz')
+        with tarfile.open(self.fname, 'w:gz') as tf:
+            for n in range(25):
+                filename = os.path.join(self.directory, 'RH1850{:04d}-V01-01-page1.txt'.format(n))
+                with open(filename, 'w') as f:
+                    f.write("Page {} of the true faith in God, for the poor man and the human system".format(n) * (n % 4))
+                tf.add(filename, arcname='./' + os.path.basename(filename))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_same_as_serial(self):
+        joiner = corpora.PhraseJoiner(ENTITIES)
+        serial = list(model.Tokenized_Corpus(self.fname, False, 'whitespace', joiner=joiner))
+        parallel = list(model.Tokenized_Corpus(self.fname, False, 'whitespace', joiner=joiner,
+                                               workers=2, chunksize=3, max_in_flight=2))
+        self.assertEqual(parallel, serial)
+        self.assertIn('true_faith', serial[1][1])
+
+    def test_lemma_cache_merged_from_workers(self):
+        joiner = corpora.PhraseJoiner(ENTITIES)
+        cache = corpora.LemmaCache(path=os.path.join(self.directory, 'lemmas.pkl'), lemmatizer=Plural())
+        serial = list(model.Tokenized_Corpus(self.fname, True, 'whitespace', joiner=joiner, lemma_cache=cache))
+        serial_lemmas = dict(cache.lemmas)
+
+        cache = corpora.LemmaCache(path=os.path.join(self.directory, 'lemmas.pkl'), lemmatizer=Plural())
+        parallel = list(model.Tokenized_Corpus(self.fname, True, 'whitespace', joiner=joiner, lemma_cache=cache,
+                                               workers=2, chunksize=3))
+        self.assertEqual(parallel, serial)
+        self.assertEqual(dict(cache.lemmas), serial_lemmas)
+        self.assertGreater(cache.stats()['hits'], 0)
+        self.assertGreaterEqual(cache.stats()['misses'], len(serial_lemmas))
+        cache.save()
+        self.assertEqual(dict(corpora.LemmaCache(path=cache.path).lemmas), serial_lemmas)
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file
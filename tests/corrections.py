@@ -0,0 +1,70 @@
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import GoH.clean
+import GoH.corrections as corrections
+
+
+def apply_functions(content):
+    content = corrections.normalize_chars(content)
+    content = corrections.replace_apostrophe_error(content)
+    content = corrections.connect_line_endings(content)
+    return corrections.remove_special_chars(content)
+
+
+class CorrectionPipelineCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.pages = {
+            "RH18500101-V01-01-page1.txt": "The Lordõs house is ful- \n filled with ■ light.",
+            "RH18500101-V01-01-page2.txt": "Stand—-—–‑fast in the ’’‘'‛´faith† of Jesus, Õ.",
+            "ST18750601-V01-02-page1.txt": "Nothing to correct here.",
+        }
+        self.source = os.path.join(self.directory, 'prev')
+        os.mkdir(self.source)
+        for filename, content in self.pages.items():
+            with open(os.path.join(self.source, filename), 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_output(self, output_dir):
+        return {filename: open(os.path.join(output_dir, filename)).read() for filename in os.listdir(output_dir)}
+
+    def test_same_as_functions(self):
+        pipeline = corrections.CorrectionPipeline()
+        for content in self.pages.values():
+            self.assertEqual(pipeline(content), apply_functions(content))
+
+    def test_run_directory(self):
+        output_dir = os.path.join(self.directory, 'cycle')
+        summary = corrections.CorrectionPipeline().run(self.source, output_dir, workers=2, chunksize=1)
+        self.assertEqual(self.read_output(output_dir),
+            {filename: apply_functions(content) for filename, content in self.pages.items()})
+        self.assertEqual(summary['documents'], 3)
+        rules = summary['rules'].set_index('rule')
+        self.assertEqual(rules.loc['connect_line_endings', 'hits'], 1)
+        self.assertEqual(rules.loc['remove_special_chars', 'documents'], 2)
+
+    def test_run_archive(self):
+        fname = os.path.join(self.directory, 'corpus.tar.gz')
+        with tarfile.open(fname, 'w:gz') as tf:
+            tf.add(self.source, arcname='corpus')
+        corrections.CorrectionPipeline().run(fname, os.path.join(self.directory, 'from_tar'))
+        corrections.CorrectionPipeline().run(self.source, os.path.join(self.directory, 'from_dir'))
+        self.assertEqual(self.read_output(os.path.join(self.directory, 'from_tar')),
+            self.read_output(os.path.join(self.directory, 'from_dir')))
+
+    def test_replacement_rule(self):
+        replacer = GoH.clean.MultiReplacer([("Lord's", "LORD'S"), ("Jesus", "Christ")])
+        pipeline = corrections.CorrectionPipeline(corrections.CORRECTION_RULES + [replacer.rule('spelling')])
+        for content in self.pages.values():
+            self.assertEqual(pipeline(content), corrections.apply_replacements(apply_functions(content), replacer))
+        self.assertEqual(pipeline.correct(self.pages["RH18500101-V01-01-page1.txt"])[1][-1][0], 1)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import GoH.clean as clean
+import GoH.corrections as corrections
+import GoH.cycles as cycles
+
+
+def join_line_endings(content):
+    return corrections.connect_line_endings(content)
+
+
+def fix_spelling(content):
+    return content.replace("tbe", "the")
+
+
+class CleaningRunCase(unittest.TestCase):
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.dictionary = {"the", "lord", "is", "good", "faith", "in", "god", "holy", "sabbath"}
+        self.pages = {
+            "RH18500101-V01-01-page1.txt": "tbe Lord is go- \nod",
+            "RH18500101-V01-01-page2.txt": "faith in God",
+            "ST18750601-V01-02-page1.txt": "tbe holy sab- bath",
+        }
+        os.mkdir(os.path.join(self.base_dir, 'raw'))
+        for filename, content in self.pages.items():
+            self.write('raw', filename, content)
+        self.cycles = [('correction1', join_line_endings), ('correction2', fix_spelling)]
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def write(self, directory, filename, content):
+        with open(os.path.join(self.base_dir, directory, filename), 'w') as f:
+            f.write(content)
+
+    def test_run_and_resume(self):
+        run = cycles.CleaningRun(self.base_dir, 'raw', self.cycles, self.dictionary)
+        summary = run.run(workers=2).set_index('cycle')
+        self.assertEqual(summary.loc['correction1', 'changed'], 2)
+        self.assertEqual(run.changed_documents('correction2'), ["RH18500101-V01-01-page1.txt", "ST18750601-V01-02-page1.txt"])
+        self.assertEqual(summary.loc['correction2', 'error_rate_after'], 0)
+        self.assertEqual(summary.loc['correction1', 'error_rate_after'], summary.loc['correction2', 'error_rate_before'])
+        self.assertLess(summary.loc['correction1', 'delta'], 0)
+        with open(os.path.join(self.base_dir, 'correction2', "RH18500101-V01-01-page1.txt")) as f:
+            self.assertEqual(f.read(), "the Lord is good")
+
+        # Only the edited document is processed again, by both cycles.
+        self.write('raw', "RH18500101-V01-01-page2.txt", "faith in Gd")
+        run = cycles.CleaningRun(self.base_dir, 'raw', self.cycles, self.dictionary)
+        self.assertEqual(run.run_cycle('raw', 'correction1', join_line_endings), 1)
+        self.assertEqual(run.run_cycle('correction1', 'correction2', fix_spelling), 1)
+        self.assertEqual(run.run_cycle('correction1', 'correction2', fix_spelling), 0)
+        self.assertGreater(run.summary().loc[0, 'error_rate_before'], summary.loc['correction1', 'error_rate_before'])
+
+    def test_dictionary_change(self):
+        cycles.CleaningRun(self.base_dir, 'raw', self.cycles, self.dictionary).run()
+        dictionary = self.dictionary | {"tbe", "sab", "bath"}
+        run = cycles.CleaningRun(self.base_dir, 'raw', self.cycles, dictionary)
+        self.assertEqual(run.run_cycle('raw', 'correction1', join_line_endings), 3)
+        summary = run.run().set_index('cycle')
+        fresh_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, fresh_dir)
+        shutil.copytree(os.path.join(self.base_dir, 'raw'), os.path.join(fresh_dir, 'raw'))
+        fresh = cycles.CleaningRun(fresh_dir, 'raw', self.cycles, dictionary).run().set_index('cycle')
+        self.assertTrue(summary.equals(fresh))
+
+    def test_function_change(self):
+        spelling = [('correction1', join_line_endings), ('correction2', clean.MultiReplacer([("tbe", "the")]))]
+        cycles.CleaningRun(self.base_dir, 'raw', spelling, self.dictionary).run()
+
+        spelling[1] = ('correction2', clean.MultiReplacer([("tbe", "the"), ("holy", "HOLY")]))
+        run = cycles.CleaningRun(self.base_dir, 'raw', spelling, self.dictionary)
+        with mock.patch.object(run, 'run_cycle', wraps=run.run_cycle) as run_cycle:
+            run.run()
+        self.assertEqual([call[1]['refresh'] for call in run_cycle.call_args_list], [False, True])
+        with open(os.path.join(self.base_dir, 'correction2', "ST18750601-V01-02-page1.txt")) as f:
+            self.assertEqual(f.read(), "the HOLY sabbath")
+
+        # A changed cycle is run again with every later cycle.
+        spelling[0] = ('correction1', clean.MultiReplacer([("sab- bath", "sabbath")]))
+        run = cycles.CleaningRun(self.base_dir, 'raw', spelling, self.dictionary)
+        with mock.patch.object(run, 'run_cycle', wraps=run.run_cycle) as run_cycle:
+            run.run()
+        self.assertEqual([call[1]['refresh'] for call in run_cycle.call_args_list], [True, True])
+        with mock.patch.object(run, 'run_cycle', wraps=run.run_cycle) as run_cycle:
+            run.run()
+        self.assertEqual([call[1]['refresh'] for call in run_cycle.call_args_list], [False, False])
+        self.assertEqual(run.run_cycle('correction1', 'correction2', spelling[1][1]), 0)
+
+    def test_deleted_document(self):
+        run = cycles.CleaningRun(self.base_dir, 'raw', self.cycles, self.dictionary)
+        run.run()
+        os.remove(os.path.join(self.base_dir, 'raw', "RH18500101-V01-01-page2.txt"))
+        run.run()
+        for name in ['correction1', 'correction2']:
+            self.assertEqual(sorted(os.listdir(os.path.join(self.base_dir, name))),
+                ["RH18500101-V01-01-page1.txt", "ST18750601-V01-02-page1.txt"])
+        self.assertEqual(run.summary()['documents'].tolist(), [2, 2])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
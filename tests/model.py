@@ -0,0 +1,77 @@
+import random
+import unittest
+from collections import Counter
+from GoH.model import SpaceSaving
+
+
+def zipf_stream(size, vocabulary, seed):
+    generator = random.Random(seed)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    return generator.choices(['phrase {}'.format(i) for i in range(vocabulary)], weights, k=size)
+
+
+class SpaceSavingCase(unittest.TestCase):
+
+    def assertBounds(self, counter, stream):
+        true = Counter(stream)
+        self.assertEqual(counter.n, len(stream))
+        self.assertLessEqual(len(counter), counter.capacity)
+        self.assertLessEqual(counter.min_count, len(stream) / counter.capacity)
+        counted = counter.most_common()
+        for item, count in counted:
+            self.assertLessEqual(count - counter.errors[item], true[item])
+            self.assertGreaterEqual(count, true[item])
+            self.assertLessEqual(counter.errors[item], counter.min_count)
+        for item, count in true.items():
+            if item not in counter:
+                self.assertLessEqual(count, counter.min_count)
+        if len(counter) == counter.capacity:
+            self.assertEqual(counter.min_count, counted[-1][1])
+
+    def test_exact_below_capacity(self):
+        stream = zipf_stream(2000, 50, seed=0)
+        counter = SpaceSaving(60)
+        counter.update(stream)
+        self.assertEqual(counter.counts, dict(Counter(stream)))
+        self.assertEqual(counter.min_count, 0)
+        self.assertEqual(counter.most_common(3), Counter(stream).most_common(3))
+
+    def test_bounds(self):
+        stream = zipf_stream(20000, 2000, seed=1)
+        counter = SpaceSaving(100)
+        counter.update(stream)
+        self.assertBounds(counter, stream)
+        top = [item for item, count in Counter(stream).most_common(5)]
+        self.assertEqual([item for item, count in counter.most_common(5)], top)
+
+    def test_weighted_add(self):
+        stream = zipf_stream(5000, 500, seed=2)
+        counter = SpaceSaving(40)
+        for item, count in Counter(stream[:2500]).items():
+            counter.add(item, count)
+        counter.update(stream[2500:])
+        self.assertBounds(counter, stream)
+
+    def test_merge(self):
+        stream = zipf_stream(30000, 3000, seed=3)
+        merged = SpaceSaving(150)
+        for start in range(0, len(stream), 4000):
+            shard = SpaceSaving(150)
+            shard.update(stream[start:start + 4000])
+            merged.merge(shard)
+            self.assertBounds(merged, stream[:start + 4000])
+        merged.update(stream[:1000])
+        self.assertBounds(merged, stream + stream[:1000])
+
+    def test_merge_below_capacity(self):
+        first, second = SpaceSaving(10), SpaceSaving(10)
+        first.update(['true faith', 'moral obligation', 'true faith'])
+        second.update(['moral obligation', 'health reform'])
+        first.merge(second)
+        self.assertEqual(first.counts, {'true faith': 2, 'moral obligation': 2, 'health reform': 1})
+        self.assertEqual(first.errors, {'true faith': 0, 'moral obligation': 0, 'health reform': 0})
+        self.assertEqual(first.n, 5)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
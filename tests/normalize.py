@@ -0,0 +1,102 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from unittest import mock
+from GoH.cache import SubstituteCache
+import GoH.normalize as normalize
+
+
+class SubstituteIndexCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(5)
+        letters = 'abdeilnorst'
+        self.dictionary = set()
+        while len(self.dictionary) < 2000:
+            self.dictionary.add(''.join(rng.choice(letters) for _ in range(rng.randint(1, 16))))
+        words = sorted(self.dictionary)
+        self.WORDS = Counter({word: rng.randint(0, 20) for word in words})
+        for word in words[:100]:
+            self.WORDS[word.title()] = rng.randint(1, 20)
+
+        self.errors = []
+        for word in rng.sample(words, 300):
+            error = list(word)
+            position = rng.randrange(len(error))
+            if rng.random() < .5:
+                error[position] = rng.choice(letters)
+            else:
+                error.insert(position, rng.choice(letters))
+            self.errors.append(''.join(error))
+
+    def test_same_substitutes_as_scan(self):
+        index = normalize.SubstituteIndex(self.dictionary, self.WORDS)
+        for error in self.errors:
+            self.assertEqual(index.substitutes(error),
+                normalize.check_for_substitutes(error, self.dictionary, self.WORDS),
+                "Substitutes differ for {}".format(error)
+                )
+
+    def test_batch_matches_scan(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'substitutes.json')
+        errors = self.errors + self.errors[:50]
+        expected = []
+        for error in dict.fromkeys(errors):
+            if 2 < len(error) < 15:
+                found = normalize.check_for_substitutes(error, self.dictionary, self.WORDS)
+                if found:
+                    expected.append((error, found[0][0]))
+
+        cache = SubstituteCache(path, self.dictionary, self.WORDS)
+        index = normalize.SubstituteIndex(self.dictionary, self.WORDS)
+        self.assertEqual(normalize.batch_spell_check(errors, self.dictionary, self.WORDS, workers=2,
+            cache=cache, index=index), expected)
+        self.assertEqual(normalize.auto_spell_check(list(dict.fromkeys(errors)), self.dictionary, self.WORDS,
+            index=index), expected)
+
+    def test_batch_uses_cached_decisions(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'substitutes.json')
+        expected = normalize.batch_spell_check(self.errors, self.dictionary, self.WORDS,
+            cache=SubstituteCache(path, self.dictionary, self.WORDS))
+
+        cache = SubstituteCache(path, self.dictionary, self.WORDS)
+        self.assertEqual(len(cache.decisions), len({error for error in self.errors if 2 < len(error) < 15}))
+        index = mock.Mock(spec=normalize.SubstituteIndex)
+        self.assertEqual(normalize.batch_spell_check(self.errors + self.errors[:50], self.dictionary, self.WORDS,
+            cache=cache, index=index), expected)
+        index.substitutes.assert_not_called()
+
+
+class WordSegmenterCase(unittest.TestCase):
+
+    def test_same_split_as_infer_spaces(self):
+        rng = random.Random(8)
+        letters = 'aeinrst'
+        WORDS = Counter()
+        while len(WORDS) < 300:
+            WORDS[''.join(rng.choice(letters) for _ in range(rng.randint(1, 7)))] = rng.randint(1, 50)
+        wordcost = normalize.zipf_word_costs(WORDS)
+        maxword = max(len(word) for word in wordcost)
+        segmenter = normalize.WordSegmenter(wordcost)
+
+        strings = [''.join(rng.choice(letters + 'xy') for _ in range(rng.randint(0, 40))) for _ in range(200)]
+        for s in strings:
+            self.assertEqual(segmenter.segment(s), normalize.infer_spaces(s, wordcost, maxword), s)
+        self.assertEqual(segmenter.segment_batch(strings + strings[:10]),
+            [normalize.infer_spaces(s, wordcost, maxword) for s in strings + strings[:10]])
+
+    def test_small_word_counts(self):
+        self.assertEqual(normalize.zipf_word_costs(Counter()), {})
+        self.assertEqual(normalize.WordSegmenter.from_counts(Counter()).segment('god'), 'g o d')
+        self.assertEqual(normalize.WordSegmenter.from_counts(Counter({'god': 3})).segment('godgod'), 'god god')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
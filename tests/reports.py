@@ -0,0 +1,172 @@
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import GoH.reports as reports
+from GoH.cache import ReportCache
+
+
+class DocReportCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dictionary = {"the", "true", "faith", "in", "god", "is", "full", "of", "moral"}
+
+    def test_fast_doc_report_matches(self):
+        pages = ["The true faith in God.\nIs full of moral obligations!",
+                 "Th3 tru\tfaith in Gd, is \u00a0full of\r\nmoral obligatons.",
+                 "\"Faith\" $5 & faith; fa1th -- faith's",
+                 "1875, 1876.",
+                 ""]
+        for page in pages:
+            self.assertEqual(reports.fast_doc_report(page, self.dictionary),
+                reports.generate_doc_report(page, self.dictionary),
+                "Fused report differs for {!r}".format(page)
+                )
+
+
+class ProcessDirectoryCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dictionary = {"the", "true", "faith", "in", "god", "is", "full", "of", "moral", "obligations"}
+        pages = {
+            "RH18500101-V01-01-page1.txt": "The true faith in God.\nIs full of moral obligations!",
+            "RH18500101-V01-01-page2.txt": "Th3 tru faith in Gd, is full of moral obligatons.",
+            "ST18750601-V01-02-page1.txt": "faith faith faith; truee faith (faith) *faith*",
+            "ST18750601-V01-02-page2.txt": "Moral obligations 1875",
+        }
+        for filename, content in pages.items():
+            with open(os.path.join(self.directory, filename), 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_order_is_stable(self):
+        statistics = reports.process_directory(self.directory, self.dictionary)
+        self.assertEqual([report['doc_id'] for report in statistics],
+            sorted(os.listdir(self.directory)),
+            "Reports are not ordered by doc_id"
+            )
+
+    def test_parallel_matches_serial(self):
+        serial = reports.process_directory(self.directory, self.dictionary)
+        parallel = reports.process_directory(self.directory, self.dictionary, workers=2, chunksize=1)
+        self.assertEqual(parallel, serial,
+            "Parallel reports differ from the serial reports"
+            )
+
+    def test_cache_rescores_changed_pages(self):
+        cache = os.path.join(self.directory, '.reports.cache')
+        first = reports.process_directory(self.directory, self.dictionary, cache=cache)
+        self.assertEqual(first, reports.process_directory(self.directory, self.dictionary),
+            "Cached run differs from an uncached run"
+            )
+
+        with open(os.path.join(self.directory, "ST18750601-V01-02-page1.txt"), 'w') as f:
+            f.write("faith in God")
+        second = reports.process_directory(self.directory, self.dictionary, cache=cache)
+        self.assertEqual(second, reports.process_directory(self.directory, self.dictionary),
+            "Changed page was not rescored"
+            )
+
+    def test_cached_reports_are_copies(self):
+        path = os.path.join(self.directory, '.reports.cache')
+        cache = ReportCache(path, self.dictionary)
+        for report in reports.process_directory(self.directory, self.dictionary, cache=cache):
+            report['errors']['faith'] = 100
+        for report in reports.process_directory(self.directory, self.dictionary, cache=cache):
+            report['errors']['faith'] = 100
+        cache.save()
+        self.assertEqual(reports.process_directory(self.directory, self.dictionary, cache=path),
+            reports.process_directory(self.directory, self.dictionary),
+            "Changing a report changed the cache"
+            )
+
+    def test_error_matrix_summaries(self):
+        statistics = reports.process_directory(self.directory, self.dictionary)
+        matrix = reports.process_directory_matrix(self.directory, self.dictionary)
+        summary = reports.get_errors_summary(statistics)
+        columns = reports.get_errors_summary(matrix)
+
+        self.assertEqual(dict(columns), dict(summary), "Error totals differ")
+        self.assertEqual(reports.top_errors(columns, 0), reports.top_errors(summary, 0),
+            "Top errors differ")
+        self.assertEqual(reports.long_errors(columns, 5), reports.long_errors(summary, 5),
+            "Long errors differ")
+        self.assertEqual(reports.tokens_with_special_characters(columns),
+            reports.tokens_with_special_characters(summary),
+            "Special character errors differ")
+
+        path = os.path.join(self.directory, '.errors.npz')
+        matrix.save(path)
+        loaded = reports.ErrorMatrix.load(path)
+        self.assertEqual(loaded.doc_errors("RH18500101-V01-01-page2.txt"), statistics[1]['errors'],
+            "Saved matrix does not reload")
+
+    def test_batches_and_running_stats(self):
+        statistics = reports.process_directory(self.directory, self.dictionary)
+        batches = list(reports.process_directory_batches(self.directory, self.dictionary, batch_size=3))
+        self.assertEqual([len(batch) for batch in batches], [3, 1], "Batches have the wrong size")
+
+        running = reports.RunningStats()
+        for batch in batches:
+            running.update(batch)
+        df = reports.utilities.stats_to_df(statistics)
+        self.assertTrue(running.to_df().equals(df), "Batched dataframe differs")
+        self.assertEqual(running.token_count(), reports.token_count(df), "Token count differs")
+        self.assertAlmostEqual(running.average_verified_rate(), reports.average_verified_rate(df))
+        self.assertAlmostEqual(running.average_error_rate(), reports.average_error_rate(df))
+
+    def test_archive_matches_directory(self):
+        statistics = reports.process_directory(self.directory, self.dictionary)
+        fname = os.path.join(tempfile.mkdtemp(), 'corpus.tar.gz')
+        with tarfile.open(fname, 'w:gz') as tf:
+            tf.add(self.directory, arcname='.')
+
+        self.assertEqual(reports.process_archive(fname, self.dictionary), statistics,
+            "Archive reports differ from the directory reports")
+        self.assertEqual(reports.process_archive(fname, self.dictionary, workers=2), statistics,
+            "Parallel archive reports differ from the directory reports")
+        self.assertEqual(reports.process_archive(fname, self.dictionary, names=["ST18750601-V01-02-page1.txt"]),
+            statistics[2:3],
+            "Selected page was not read from the archive")
+        shutil.rmtree(os.path.dirname(fname))
+
+    def test_archive_skips_hidden_files(self):
+        statistics = reports.process_directory(self.directory, self.dictionary)
+        for hidden in ["._RH18500101-V01-01-page1.txt", ".DS_Store"]:
+            with open(os.path.join(self.directory, hidden), 'w') as f:
+                f.write("Th3 tru faith")
+        fname = os.path.join(tempfile.mkdtemp(), 'corpus.tar')
+        with tarfile.open(fname, 'w') as tf:
+            tf.add(self.directory, arcname='.')
+
+        self.assertEqual(reports.process_archive(fname, self.dictionary), statistics,
+            "Hidden files of the archive were scored")
+        self.assertEqual(reports.process_archive(fname, self.dictionary, workers=2), statistics,
+            "Archive ranges differ from the directory reports")
+        shutil.rmtree(os.path.dirname(fname))
+
+    def test_archive_duplicate_doc_ids(self):
+        fname = os.path.join(tempfile.mkdtemp(), 'corpus.tar')
+        with tarfile.open(fname, 'w') as tf:
+            tf.add(self.directory, arcname='a')
+            tf.add(self.directory, arcname='b')
+
+        with self.assertRaises(ValueError):
+            reports.process_archive(fname, self.dictionary)
+        shutil.rmtree(os.path.dirname(fname))
+
+    def test_query_docs(self):
+        df = reports.utilities.stats_to_df(reports.process_directory(self.directory, self.dictionary))
+        docs = reports.query_docs(df, min_error_rate=0, titles=["RH", "ST"], years=[1850], sort_by='error_rate')
+        self.assertEqual(docs['doc_id'].tolist(), ["RH18500101-V01-01-page2.txt"],
+            "Query selected the wrong documents")
+        rates = [rate for doc_id, rate in reports.docs_with_high_error_rate(df, 0)]
+        self.assertEqual(rates, sorted(df['error_rate'][df['error_rate'] > 0], reverse=True),
+            "Documents are not sorted by error rate")
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
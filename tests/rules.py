@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+import GoH.rules as rules
+from GoH.tokenindex import load_token_index
+
+
+class RuleStoreCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'prev')
+        os.mkdir(self.source)
+        pages = {
+            "RH18500101-V01-01-page1.txt": "Teh Lord is faithfull.",
+            "RH18500101-V01-01-page2.txt": "Stand fast in teh faith, brethern.",
+            "ST18750601-V01-02-page1.txt": "Nothing to correct here.",
+        }
+        for filename, content in pages.items():
+            with open(os.path.join(self.source, filename), 'w') as f:
+                f.write(content)
+        self.store = rules.RuleStore(os.path.join(self.directory, 'rules.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_output(self, output_dir):
+        return {filename: open(os.path.join(output_dir, filename)).read()
+                for filename in os.listdir(output_dir) if not filename.startswith('.')}
+
+    def test_versions(self):
+        self.assertEqual(self.store.add_pairs([("teh", "the"), ("Teh", "The")]), 1)
+        self.assertEqual(self.store.add_pairs({"teh": "the"}), 1)
+        self.assertEqual(self.store.remove_pairs(["Teh"], note='undo'), 2)
+        store = rules.RuleStore(self.store.path)
+        self.assertEqual(store.rules(), {'pairs': {"teh": "the"}, 'repeating': []})
+        self.assertEqual(store.rules(1)['pairs'], {"teh": "the", "Teh": "The"})
+        self.assertEqual(store.changed_since(1), ({"Teh"}, False))
+
+    def test_documents_found(self):
+        index = load_token_index(self.source)
+        self.assertEqual(index.documents("teh"), ["RH18500101-V01-01-page1.txt", "RH18500101-V01-01-page2.txt"])
+        self.assertEqual(index.documents("faith, brethern"), ["RH18500101-V01-01-page2.txt"])
+        self.assertEqual(index.documents("none"), [])
+
+    def test_targeted_rewrite(self):
+        output_dir = os.path.join(self.directory, 'cycle')
+        self.store.add_pairs([("teh", "the"), ("Teh", "The")])
+        self.assertIsNone(rules.apply_rules(self.store, self.source, output_dir)['rewritten'])
+
+        self.store.add_pairs([("brethern", "brethren")])
+        summary = rules.apply_rules(self.store, self.source, output_dir)
+        self.assertEqual(summary['rewritten'], ["RH18500101-V01-01-page2.txt"])
+        self.assertEqual(summary['version'], 2)
+
+        full_dir = os.path.join(self.directory, 'full')
+        rules.apply_rules(self.store, self.source, full_dir)
+        self.assertEqual(self.read_output(output_dir), self.read_output(full_dir))
+        self.assertEqual(self.read_output(output_dir)["RH18500101-V01-01-page2.txt"], "Stand fast in the faith, brethren.")
+        self.assertEqual(os.listdir(self.source).count('.token_index.npz'), 0)
+
+    def test_source_changes(self):
+        output_dir = os.path.join(self.directory, 'cycle')
+        self.store.add_pairs([("teh", "the")])
+        rules.apply_rules(self.store, self.source, output_dir)
+
+        with open(os.path.join(self.source, "RH18500101-V01-01-page2.txt"), 'w') as f:
+            f.write("teh Nothing")
+        with open(os.path.join(self.source, "ST18750601-V01-02-page2.txt"), 'w') as f:
+            f.write("In teh beginning")
+        os.remove(os.path.join(self.source, "ST18750601-V01-02-page1.txt"))
+        summary = rules.apply_rules(self.store, self.source, output_dir)
+        self.assertEqual(summary['rewritten'], ["RH18500101-V01-01-page2.txt", "ST18750601-V01-02-page2.txt"])
+
+        full_dir = os.path.join(self.directory, 'full')
+        rules.apply_rules(self.store, self.source, full_dir)
+        self.assertEqual(self.read_output(output_dir), self.read_output(full_dir))
+        self.assertEqual(self.read_output(output_dir)["RH18500101-V01-01-page2.txt"], "the Nothing")
+
+        other = os.path.join(self.directory, 'other')
+        shutil.copytree(self.source, other)
+        self.assertIsNone(rules.apply_rules(self.store, other, output_dir)['rewritten'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
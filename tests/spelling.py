@@ -0,0 +1,42 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import GoH.spelling as spelling
+from GoH.cache import dictionary_fingerprint
+
+
+class CompiledDictionaryCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'names.txt'), 'w') as f:
+            f.write("Battle\nCreek\nKellogg\nÉcole\n")
+        with open(os.path.join(self.directory, 'words.txt'), 'w') as f:
+            f.write("battle\nbat\nhealth\nheal\nhe\nsanitarium\n")
+        self.words = {"battle", "creek", "kellogg", "école", "bat", "health", "heal", "he", "sanitarium"}
+        self.dictionary = spelling.compile_spelling_dictionary(self.directory, ['names.txt', 'words.txt'],
+            os.path.join(self.directory, 'spelling.dict'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_same_words_as_set(self):
+        self.assertEqual(self.dictionary, self.words, "Compiled dictionary has different words")
+        self.assertEqual(self.dictionary.fingerprint, dictionary_fingerprint(self.words),
+            "Fingerprint differs from the fingerprint of the set")
+
+    def test_queries(self):
+        self.assertEqual(self.dictionary.words_by_length(3, 4), ["bat", "heal"],
+            "Length query is incorrect")
+        self.assertEqual(self.dictionary.with_prefix("hea"), ["heal", "health"],
+            "Prefix query is incorrect")
+
+    def test_pickle_reloads_file(self):
+        restored = pickle.loads(pickle.dumps(self.dictionary))
+        self.assertIsInstance(restored, spelling.SpellingDictionary)
+        self.assertEqual(restored.words_by_length(2), ["he"], "Unpickled dictionary is incorrect")
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+import unittest
+from gensim.corpora import Dictionary
+import GoH.tokencache as tokencache
+
+
+class TokenCacheCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.corpus = [
+            ("RH18500101-V01-01-page1.txt", 0, ["true_faith", "god", "moral", "obligation", "god"]),
+            ("RH18500101-V01-01-page2.txt", 1, []),
+            ("ST18750601-V01-02-page1.txt", 2, ["sabbath", "god", "health", "health", "reform"]),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        cache = tokencache.materialize(self.corpus, os.path.join(self.directory, 'cache'))
+        self.assertEqual(list(tokencache.TokenCache(cache.path)), self.corpus)
+        self.assertEqual(len(cache), 3)
+
+    def test_two_item_corpus(self):
+        cache = tokencache.materialize([(title, tokens) for title, doc_id, tokens in self.corpus],
+                                       os.path.join(self.directory, 'cache'))
+        self.assertEqual(list(cache), self.corpus)
+
+    def test_bow_matches_doc2bow(self):
+        cache = tokencache.materialize(self.corpus, os.path.join(self.directory, 'cache'))
+        dictionary = Dictionary(tokens for title, doc_id, tokens in cache)
+        dictionary.filter_tokens(bad_ids=[dictionary.token2id["god"]])
+        bow = cache.bow(dictionary)
+        self.assertEqual(list(bow), [dictionary.doc2bow(tokens) for title, doc_id, tokens in self.corpus])
+        self.assertEqual(list(bow), list(bow))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import GoH.tokenindex as tokenindex
+
+
+class TokenIndexCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'corpus')
+        os.mkdir(self.source)
+        pages = {
+            "RH18500101-V01-01-page1.txt": "The Lord's day is the sabbath.\ntbe lord is good.",
+            "RH18500101-V01-01-page2.txt": "Keep the sabbath day holy, for the lord's day is tbe",
+            "ST18750601-V01-02-page1.txt": "Sabbath-day reading.",
+        }
+        for filename, content in pages.items():
+            with open(os.path.join(self.source, filename), 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lookups(self):
+        index = tokenindex.load_token_index(self.source)
+        self.assertEqual(index.doc_freq("Sabbath"), 3)
+        self.assertEqual(index.docs_containing("tbe"), ["RH18500101-V01-01-page1.txt", "RH18500101-V01-01-page2.txt"])
+        self.assertEqual(index.docs_containing("sabbath day"), ["RH18500101-V01-01-page2.txt", "ST18750601-V01-02-page1.txt"])
+        self.assertEqual(index.documents("day sabbath"), index.doc_ids)
+
+    def test_phrase_spacing(self):
+        pages = {"a.txt": "sabbath day", "b.txt": "sabbath  day", "c.txt": "the sabbath,\nday", "d.txt": "day sabbath"}
+        for filename, content in pages.items():
+            with open(os.path.join(self.source, filename), 'w') as f:
+                f.write(content)
+        index = tokenindex.load_token_index(self.source)
+        self.assertEqual(index.docs_containing("sabbath day"),
+            ["RH18500101-V01-01-page2.txt", "ST18750601-V01-02-page1.txt", "a.txt", "b.txt", "c.txt"])
+        self.assertEqual(index.docs_containing("sabbath   day"), index.docs_containing("sabbath day"))
+        lines = index.concordance_list("sabbath day")
+        self.assertEqual([line.query for line in lines if line.doc_id in pages],
+            ["sabbath day", "sabbath day", "sabbath, day"])
+        self.assertEqual([line.left for line in lines if line.doc_id == "c.txt"], [["the"]])
+
+    def test_concordance(self):
+        index = tokenindex.load_token_index(self.source)
+        lines = index.concordance_list("lord's")
+        self.assertEqual([(line.doc_id, line.query, line.right[:2]) for line in lines],
+            [("RH18500101-V01-01-page1.txt", "Lord's", ["day", "is"]),
+             ("RH18500101-V01-01-page2.txt", "lord's", ["day", "is"])])
+        self.assertEqual(lines[1].left[-2:], ["for", "the"])
+
+    def test_saved_and_archive(self):
+        index = tokenindex.load_token_index(self.source)
+        self.assertTrue(os.path.exists(tokenindex.index_path(self.source)))
+        self.assertEqual(tokenindex.load_token_index(self.source).vocabulary, index.vocabulary)
+
+        fname = os.path.join(self.directory, 'corpus.tar.gz')
+        with tarfile.open(fname, 'w:gz') as tf:
+            tf.add(self.source, arcname='corpus', filter=lambda member: None if member.name.endswith('.npz') else member)
+        from_archive = tokenindex.load_token_index(fname)
+        self.assertEqual(from_archive.concordance_list("tbe"), index.concordance_list("tbe"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
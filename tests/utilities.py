@@ -0,0 +1,42 @@
+import os
+import shutil
+import tempfile
+import unittest
+import GoH.utilities as utilities
+
+
+class PageIdCase(unittest.TestCase):
+
+    def setUp(self):
+        self.page_ids = ["RH18500101-V01-01-page1.txt", "ADV19140315-V16-11-page12.txt", "HR18860101-V01-01-page3.txt"]
+
+    def test_parse_page_ids(self):
+        df = utilities.parse_page_ids(self.page_ids)
+        self.assertEqual(df.iloc[1][['title', 'year', 'month', 'day', 'volume', 'issue', 'page']].tolist(),
+            ["ADV", 1914, 3, 15, 16, 11, 12],
+            "Page id was not parsed correctly"
+            )
+
+    def test_matches_get_year_and_title(self):
+        df = utilities.parse_page_ids(self.page_ids)
+        self.assertEqual(df['year'].astype(str).tolist(), [utilities.get_year(page_id) for page_id in self.page_ids],
+            "Years differ from get_year")
+        self.assertEqual(df['title'].tolist(), [utilities.get_title(page_id) for page_id in self.page_ids],
+            "Titles differ from get_title")
+
+    def test_page_index_update_matches_rebuild(self):
+        directory = tempfile.mkdtemp()
+        for page_id in self.page_ids[:2] + ["18500101-V01-01-page2.txt"]:
+            open(os.path.join(directory, page_id), 'w').close()
+        utilities.page_index(directory)
+        open(os.path.join(directory, self.page_ids[2]), 'w').close()
+
+        updated = utilities.page_index(directory)
+        rebuilt = utilities.page_index(directory, refresh=True)
+        shutil.rmtree(directory)
+        self.assertTrue(updated.equals(rebuilt), "Updated page index differs from a rebuilt index")
+        self.assertTrue(updated['title'].isnull().any(), "Missing title is not NaN")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)